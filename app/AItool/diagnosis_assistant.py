@@ -1,5 +1,91 @@
-from typing import List, Dict, Any, Optional
-import json
+from typing import List, Dict, Any, Optional, Tuple, TYPE_CHECKING
+from pathlib import Path
+import numpy as np
+
+if TYPE_CHECKING:
+    from app.AItool.knowledge_base import KnowledgeBaseRegistry
+
+SYMPTOMS_DB_PATH = Path(__file__).resolve().parent.parent / "demoData" / "symptoms.json"
+
+def normalize_symptom(symptom: str) -> str:
+    """Normalize a symptom name for lookups"""
+    return " ".join(symptom.lower().split())
+
+class SymptomIndex:
+    """
+    Symptom knowledge base compiled into a sparse symptom × condition matrix.
+    Each row holds log(1 - confidence) for the conditions a symptom suggests, so
+    combining several symptoms (noisy-OR) is a sum over the selected rows.
+    """
+    
+    def __init__(self, symptoms_db: Dict[str, List[Dict[str, Any]]]):
+        self.symptom_ids: Dict[str, int] = {}
+        self.conditions: List[Dict[str, Any]] = []
+        condition_ids: Dict[str, int] = {}
+        rows: List[Dict[int, float]] = []
+        
+        for symptom, entries in symptoms_db.items():
+            key = normalize_symptom(symptom)
+            if key not in self.symptom_ids:
+                self.symptom_ids[key] = len(rows)
+                rows.append({})
+            row = rows[self.symptom_ids[key]]
+            for entry in entries:
+                name = entry.get("condition")
+                if not name:
+                    continue
+                if name not in condition_ids:
+                    condition_ids[name] = len(self.conditions)
+                    self.conditions.append({
+                        "condition": name,
+                        "severity": entry.get("severity", 1),
+                        "description": entry.get("description", ""),
+                    })
+                j = condition_ids[name]
+                row[j] = max(row.get(j, 0.0), float(entry.get("confidence", 0)))
+                
+        # CSR layout: row i spans indices[indptr[i]:indptr[i + 1]]
+        self.indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        self.indptr[1:] = np.cumsum([len(row) for row in rows])
+        self.indices = np.fromiter((j for row in rows for j in row), dtype=np.int64, count=int(self.indptr[-1]))
+        confidences = np.fromiter((c for row in rows for c in row.values()), dtype=np.float64, count=int(self.indptr[-1]))
+        self.log_miss = np.log1p(-np.clip(confidences, 0.0, 1.0 - 1e-9))
+        self.severity = np.array([c["severity"] for c in self.conditions], dtype=np.int64)
+        
+    def score(self, symptoms: List[str], top_k: int = 3) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """
+        Score every condition against the reported symptoms.
+        Returns the top_k conditions by combined confidence and the highest
+        severity among all matching conditions (None if nothing matched).
+        """
+        ids = {self.symptom_ids[key] for key in map(normalize_symptom, symptoms) if key in self.symptom_ids}
+        if not ids:
+            return [], None
+            
+        spans = [slice(self.indptr[i], self.indptr[i + 1]) for i in sorted(ids)]
+        indices = np.concatenate([self.indices[span] for span in spans])
+        log_miss = np.concatenate([self.log_miss[span] for span in spans])
+        
+        n = len(self.conditions)
+        matched = np.bincount(indices, minlength=n)
+        scores = -np.expm1(np.bincount(indices, weights=log_miss, minlength=n))
+        candidates = np.flatnonzero(matched)
+        if candidates.size == 0:
+            return [], None
+            
+        k = min(top_k, candidates.size)
+        top = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        
+        diagnoses = [
+            {
+                **self.conditions[j],
+                "confidence": round(float(scores[j]), 4),
+                "matched_symptoms": int(matched[j]),
+            }
+            for j in top
+        ]
+        return diagnoses, int(self.severity[candidates].max())
 
 class DiagnosisAssistant:
     """
@@ -7,17 +93,15 @@ class DiagnosisAssistant:
     This is a placeholder implementation that would be connected to an actual AI model.
     """
     
-    def __init__(self):
-        self.symptoms_db = self._load_symptoms_db()
+    def __init__(self, knowledge_base: Optional["KnowledgeBaseRegistry"] = None):
+        if knowledge_base is None:
+            from app.AItool.knowledge_base import knowledge_base
+        self.knowledge_base = knowledge_base
         
-    def _load_symptoms_db(self) -> Dict[str, List[Dict[str, Any]]]:
-        """Load the symptoms database from the demo data"""
-        try:
-            with open("app/demoData/symptoms.json", "r") as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            # Return empty database if file doesn't exist or is invalid
-            return {}
+    @property
+    def index(self) -> SymptomIndex:
+        """Compiled symptom index of the current knowledge base"""
+        return self.knowledge_base.current.symptom_index
             
     async def analyze_symptoms(self, symptoms: List[str]) -> Dict[str, Any]:
         """
@@ -29,31 +113,27 @@ class DiagnosisAssistant:
         Returns:
             Dictionary containing possible diagnoses and recommendations
         """
-        possible_conditions = []
+        return self.analyze(symptoms)
         
-        # Simple matching algorithm (would be replaced by ML model)
-        for symptom in symptoms:
-            if symptom in self.symptoms_db:
-                for condition in self.symptoms_db[symptom]:
-                    if condition not in possible_conditions:
-                        possible_conditions.append(condition)
-        
-        # Sort by confidence score
-        possible_conditions.sort(key=lambda x: x.get("confidence", 0), reverse=True)
+    def analyze(self, symptoms: List[str], top_k: int = 3) -> Dict[str, Any]:
+        """
+        Synchronous core of analyze_symptoms.
+        Conditions explained by several reported symptoms score higher, since
+        their confidences are combined rather than taken individually.
+        """
+        possible_conditions, max_severity = self.index.score(symptoms, top_k=top_k)
         
         return {
-            "possible_diagnoses": possible_conditions[:3],  # Top 3 matches
-            "recommendation": self._generate_recommendation(possible_conditions),
+            "possible_diagnoses": possible_conditions,
+            "recommendation": self._generate_recommendation(max_severity),
             "disclaimer": "This is an AI-assisted suggestion and not a medical diagnosis. Please consult with a healthcare professional."
         }
         
-    def _generate_recommendation(self, conditions: List[Dict[str, Any]]) -> str:
-        """Generate a recommendation based on possible conditions"""
-        if not conditions:
+    def _generate_recommendation(self, severity: Optional[int]) -> str:
+        """Generate a recommendation based on the most severe possible condition"""
+        if severity is None:
             return "No matching conditions found. Please consult with a healthcare professional for proper diagnosis."
             
-        severity = max([c.get("severity", 1) for c in conditions])
-        
         if severity >= 8:
             return "Urgent medical attention recommended. Please seek immediate medical care."
         elif severity >= 5:
@@ -0,0 +1,122 @@
+from typing import Any, Dict, Optional, Tuple
+from pathlib import Path
+from fastapi.concurrency import run_in_threadpool
+from app.AItool.diagnosis_assistant import SYMPTOMS_DB_PATH, SymptomIndex
+from app.AItool.medication_advisor import MEDICATIONS_CATALOG_PATH, InteractionIndex
+from app.core.config import settings
+from app.core.tasks import PeriodicTask
+import json
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# (mtime_ns, size) per source file; None when the file is missing
+Fingerprint = Tuple[Optional[Tuple[int, int]], ...]
+
+def read_json_source(path: Path) -> Dict[str, Any]:
+    """Read a knowledge base source file; a missing file is an empty source"""
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+class KnowledgeBase:
+    """
+    Immutable snapshot of the AI knowledge bases and their compiled indexes.
+    Requests keep using the snapshot they started with while a newer one is swapped in.
+    """
+    def __init__(self, symptoms_db: Dict[str, Any], medications_catalog: Dict[str, Any], fingerprint: Fingerprint, version: int):
+        self.symptoms_db = symptoms_db
+        self.medications_catalog = medications_catalog
+        self.symptom_index = SymptomIndex(symptoms_db)
+        self.interaction_index = InteractionIndex(medications_catalog)
+        self.fingerprint = fingerprint
+        self.version = version
+        self.loaded_at = time.time()
+
+# Raised while compiling a malformed source (bad JSON, missing keys, wrong types)
+SOURCE_ERRORS = (ValueError, KeyError, TypeError, AttributeError)
+
+class KnowledgeBaseRegistry:
+    """
+    Process-wide holder of the current KnowledgeBase.
+    Source files are checked by mtime every `reload_interval` seconds; a changed
+    set of files is compiled off the event loop and replaces the current
+    snapshot with a single reference assignment.
+    """
+    def __init__(
+        self,
+        symptoms_path: Path = SYMPTOMS_DB_PATH,
+        medications_path: Path = MEDICATIONS_CATALOG_PATH,
+        reload_interval: float = 0,
+    ):
+        self.symptoms_path = symptoms_path
+        self.medications_path = medications_path
+        self._current: Optional[KnowledgeBase] = None
+        self._rejected: Optional[Fingerprint] = None
+        self._reloader = PeriodicTask("knowledge-base-reload", reload_interval, self.reload_if_changed)
+
+    @property
+    def current(self) -> KnowledgeBase:
+        """The latest compiled knowledge base (loaded on first access if needed)"""
+        if self._current is None:
+            try:
+                self._current = self._compile(self._fingerprint())
+            except SOURCE_ERRORS:
+                # Serve an empty knowledge base rather than failing every request;
+                # the empty fingerprint makes the next reload check try again
+                logger.exception("Invalid knowledge base source, starting empty")
+                self._current = KnowledgeBase({}, {}, (), 0)
+        return self._current
+
+    def _fingerprint(self) -> Fingerprint:
+        stats = []
+        for path in (self.symptoms_path, self.medications_path):
+            try:
+                st = os.stat(path)
+                stats.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                stats.append(None)
+        return tuple(stats)
+
+    def _compile(self, fingerprint: Fingerprint) -> KnowledgeBase:
+        version = self._current.version + 1 if self._current else 1
+        return KnowledgeBase(
+            read_json_source(self.symptoms_path),
+            read_json_source(self.medications_path),
+            fingerprint,
+            version,
+        )
+
+    async def reload_if_changed(self) -> bool:
+        """Recompile and swap in the knowledge base if a source file changed"""
+        fingerprint = self._fingerprint()
+        if fingerprint == self._rejected or (self._current is not None and fingerprint == self._current.fingerprint):
+            return False
+        try:
+            knowledge_base = await run_in_threadpool(self._compile, fingerprint)
+        except SOURCE_ERRORS:
+            # Most likely a file caught mid-write; keep serving the current version
+            # until the files change again
+            logger.exception("Invalid knowledge base source, keeping the current version")
+            self._rejected = fingerprint
+            if self._current is None:
+                self._current = KnowledgeBase({}, {}, (), 0)
+            return False
+        self._current = knowledge_base
+        logger.info("Loaded knowledge base version %s", knowledge_base.version)
+        return True
+
+    async def start(self) -> None:
+        """Load the knowledge base and start watching the source files"""
+        await self.reload_if_changed()
+        self._reloader.start()
+
+    async def stop(self) -> None:
+        """Stop watching the source files"""
+        await self._reloader.stop()
+
+knowledge_base = KnowledgeBaseRegistry(reload_interval=settings.KNOWLEDGE_BASE_RELOAD_INTERVAL)
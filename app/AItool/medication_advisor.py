@@ -1,4 +1,115 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterable, Set, Tuple, TYPE_CHECKING
+from pathlib import Path
+
+if TYPE_CHECKING:
+    from app.AItool.knowledge_base import KnowledgeBaseRegistry
+
+MEDICATIONS_CATALOG_PATH = Path(__file__).resolve().parent.parent / "demoData" / "medications.json"
+
+# Drug-level interactions not covered by the catalog (would be from a real database)
+KNOWN_INTERACTIONS = [
+    {"medications": ["aspirin", "ibuprofen"], "severity": "moderate", "effect": "May increase risk of bleeding"},
+    {"medications": ["lisinopril", "potassium supplements"], "severity": "moderate", "effect": "May cause high potassium levels"},
+    {"medications": ["simvastatin", "erythromycin"], "severity": "moderate", "effect": "May increase risk of muscle damage"},
+    {"medications": ["warfarin", "aspirin"], "severity": "moderate", "effect": "Increased bleeding risk"},
+    {"medications": ["fluoxetine", "tramadol"], "severity": "moderate", "effect": "Risk of serotonin syndrome"},
+]
+
+# Class membership for common drugs missing from the catalog
+KNOWN_DRUG_CLASSES = {
+    "aspirin": "NSAID",
+    "ibuprofen": "NSAID",
+    "naproxen": "NSAID",
+    "diclofenac": "NSAID",
+    "erythromycin": "Macrolide antibiotic",
+    "clarithromycin": "Macrolide antibiotic",
+    "azithromycin": "Macrolide antibiotic",
+    "simvastatin": "Statin",
+    "rosuvastatin": "Statin",
+    "pravastatin": "Statin",
+    "fluoxetine": "SSRI",
+    "citalopram": "SSRI",
+    "escitalopram": "SSRI",
+}
+
+def normalize_drug(name: str) -> str:
+    """
+    Normalize a drug or drug class name for lookups.
+    A trailing plural "s" is dropped so "ACE Inhibitors" matches "ACE Inhibitor".
+    """
+    words = name.lower().split()
+    if words and len(words[-1]) > 3 and words[-1].endswith("s") and not words[-1].endswith("ss"):
+        words[-1] = words[-1][:-1]
+    return " ".join(words)
+
+def pair_key(a: str, b: str) -> Tuple[str, str]:
+    """Key for an unordered pair of normalized names"""
+    return (a, b) if a <= b else (b, a)
+
+class InteractionIndex:
+    """
+    Drug interaction rules indexed by normalized, unordered drug pairs.
+    Class-level rules (e.g. "Warfarin" + "NSAIDs") are expanded up front to every
+    known member of the class, so checking k medications costs O(k²) lookups.
+    """
+    
+    def __init__(self, catalog: Dict[str, Any]):
+        members: Dict[str, Set[str]] = {}
+        for drug, drug_class in KNOWN_DRUG_CLASSES.items():
+            members.setdefault(normalize_drug(drug_class), set()).add(normalize_drug(drug))
+        for medication in catalog.get("common_medications", []):
+            if medication.get("name") and medication.get("class"):
+                members.setdefault(normalize_drug(medication["class"]), set()).add(normalize_drug(medication["name"]))
+                
+        self.members = members
+        self.pairs: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        for rule in catalog.get("interactions", []):
+            self._add_rule(rule)
+            
+        # Built-in rules only fill pairs the catalog does not cover
+        covered = set(self.pairs)
+        for rule in KNOWN_INTERACTIONS:
+            self._add_rule(rule, skip=covered)
+            
+    def _add_rule(self, rule: Dict[str, Any], skip: Set[Tuple[str, str]] = frozenset()) -> None:
+        if len(rule.get("medications", [])) != 2:
+            return
+        entry = {
+            "severity": str(rule.get("severity", "moderate")).lower(),
+            "warning": rule.get("effect", ""),
+            "recommendation": rule.get("recommendation"),
+        }
+        first, second = (self._expand(name) for name in rule["medications"])
+        for a in first:
+            for b in second:
+                key = pair_key(a, b)
+                if a == b or key in skip:
+                    continue
+                bucket = self.pairs.setdefault(key, [])
+                if entry not in bucket:
+                    bucket.append(entry)
+                    
+    def _expand(self, name: str) -> Set[str]:
+        """A drug name or class name plus every known member of that class"""
+        key = normalize_drug(name)
+        return {key} | self.members.get(key, set())
+        
+    def find(self, names: Iterable[str]) -> List[Dict[str, Any]]:
+        """Find the interactions between every pair of the given medication names"""
+        meds = []
+        seen = set()
+        for name in names:
+            key = normalize_drug(name)
+            if key not in seen:
+                seen.add(key)
+                meds.append((name.lower(), key))
+                
+        interactions = []
+        for i, (name_a, key_a) in enumerate(meds):
+            for name_b, key_b in meds[i + 1:]:
+                for entry in self.pairs.get(pair_key(key_a, key_b), ()):
+                    interactions.append({"medications": [name_a, name_b], **entry})
+        return interactions
 
 class MedicationAdvisor:
     """
@@ -6,6 +117,16 @@ class MedicationAdvisor:
     This is a placeholder implementation that would be connected to an actual AI model.
     """
     
+    def __init__(self, knowledge_base: Optional["KnowledgeBaseRegistry"] = None):
+        if knowledge_base is None:
+            from app.AItool.knowledge_base import knowledge_base
+        self.knowledge_base = knowledge_base
+        
+    @property
+    def interaction_index(self) -> InteractionIndex:
+        """Interaction index of the current knowledge base"""
+        return self.knowledge_base.current.interaction_index
+        
     async def check_interactions(self, medications: List[Dict[str, str]]) -> Dict[str, Any]:
         """
         Check for potential drug interactions between medications
@@ -16,34 +137,34 @@ class MedicationAdvisor:
         Returns:
             Dictionary containing interaction warnings and recommendations
         """
-        # This would be connected to a drug interaction database
-        # Simple implementation for demonstration
-        med_names = [med["name"].lower() for med in medications]
-        interactions = []
+        return self.screen([med["name"] for med in medications])
         
-        # Example interactions (would be from a real database)
-        known_interactions = {
-            ("aspirin", "ibuprofen"): "May increase risk of bleeding",
-            ("lisinopril", "potassium supplements"): "May cause high potassium levels",
-            ("simvastatin", "erythromycin"): "May increase risk of muscle damage",
-            ("warfarin", "aspirin"): "Increased bleeding risk",
-            ("fluoxetine", "tramadol"): "Risk of serotonin syndrome"
-        }
+    async def check_interactions_batch(self, medication_lists: List[List[Dict[str, str]]]) -> List[Dict[str, Any]]:
+        """
+        Check several medication lists (e.g. one per patient) in one call
+        
+        Args:
+            medication_lists: Lists of medications with name, dosage, etc.
+            
+        Returns:
+            One interaction report per list, in the same order
+        """
+        return self.screen_batch([[med["name"] for med in medications] for medications in medication_lists])
+        
+    def screen(self, med_names: List[str]) -> Dict[str, Any]:
+        """Synchronous core of check_interactions, working on medication names"""
+        interactions = self.interaction_index.find(med_names)
         
-        for (med1, med2), warning in known_interactions.items():
-            if med1 in med_names and med2 in med_names:
-                interactions.append({
-                    "medications": [med1, med2],
-                    "severity": "moderate",
-                    "warning": warning
-                })
-                
         return {
             "interactions": interactions,
             "recommendation": self._generate_recommendation(interactions),
             "disclaimer": "This is an automated check and not a substitute for pharmacist review."
         }
         
+    def screen_batch(self, med_name_lists: List[List[str]]) -> List[Dict[str, Any]]:
+        """Synchronous core of check_interactions_batch"""
+        return [self.screen(med_names) for med_names in med_name_lists]
+        
     def _generate_recommendation(self, interactions: List[Dict[str, Any]]) -> str:
         """Generate a recommendation based on detected interactions"""
         if not interactions:
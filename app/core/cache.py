@@ -0,0 +1,146 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Generic, Hashable, Optional, Tuple, TypeVar
+from app.core.config import settings
+import time
+
+V = TypeVar('V')
+
+class TTLCache(Generic[V]):
+    """
+    In-process cache bounded by entry count (LRU eviction) and entry age (TTL).
+    Not shared between workers, so every entry may be stale by up to `ttl` seconds.
+    With a `stale_ttl`, expired entries are kept that much longer so `lookup`
+    can serve them while the caller refreshes them (stale-while-revalidate).
+    """
+    def __init__(self, *, max_size: int, ttl: float, stale_ttl: float = 0.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[V]:
+        """Return the cached value, or None if it is missing or expired"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        value, expires_at = entry
+        now = time.monotonic()
+        if expires_at <= now:
+            if expires_at + self.stale_ttl <= now:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def lookup(self, key: Hashable) -> Optional[Tuple[V, bool]]:
+        """
+        Return (value, fresh) for an entry that is fresh or still within its
+        stale window, or None on a miss
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        value, expires_at = entry
+        now = time.monotonic()
+        if expires_at + self.stale_ttl <= now:
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        if expires_at <= now:
+            self.stale_hits += 1
+            return value, False
+        self.hits += 1
+        return value, True
+
+    def peek(self, key: Hashable) -> Optional[V]:
+        """Return the stored value, even if expired, without touching the counters"""
+        entry = self._entries.get(key)
+        return entry[0] if entry is not None else None
+
+    def set(self, key: Hashable, value: V) -> None:
+        """Store a value, evicting the least recently used entries when full"""
+        if self.max_size <= 0:
+            return
+        self._entries[key] = (value, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        """Drop a single entry"""
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Drop all entries"""
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current occupancy"""
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits + self.stale_hits) / lookups if lookups else 0.0,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "stale_ttl": self.stale_ttl,
+        }
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """Sizing of a per-model entity cache, see CRUDBase"""
+    max_size: int
+    ttl: float
+    # How long past `ttl` an entry may still be served while it is refreshed
+    stale_ttl: float = 0.0
+
+# Entity caches by table name; CRUDBase instances of the same table share one
+entity_caches: Dict[str, TTLCache] = {}
+
+def get_entity_cache(table_name: str, policy: CachePolicy) -> TTLCache:
+    """The entity cache of a table, created with `policy` on first use"""
+    cache = entity_caches.get(table_name)
+    if cache is None:
+        cache = entity_caches[table_name] = TTLCache(
+            max_size=policy.max_size,
+            ttl=policy.ttl,
+            stale_ttl=policy.stale_ttl,
+        )
+    return cache
+
+# Authenticated users keyed by the JWT subject, see get_current_user
+user_cache: TTLCache = TTLCache(
+    max_size=settings.USER_CACHE_MAX_SIZE,
+    ttl=settings.USER_CACHE_TTL_SECONDS,
+)
+
+# Read-through caches of rows by id for hot, mostly-read tables
+USER_ENTITY_CACHE = CachePolicy(
+    max_size=settings.USER_ENTITY_CACHE_SIZE,
+    ttl=settings.USER_ENTITY_CACHE_TTL_SECONDS,
+    stale_ttl=settings.ENTITY_CACHE_STALE_SECONDS,
+)
+PATIENT_ENTITY_CACHE = CachePolicy(
+    max_size=settings.PATIENT_ENTITY_CACHE_SIZE,
+    ttl=settings.PATIENT_ENTITY_CACHE_TTL_SECONDS,
+    stale_ttl=settings.ENTITY_CACHE_STALE_SECONDS,
+)
+APPOINTMENT_ENTITY_CACHE = CachePolicy(
+    max_size=settings.APPOINTMENT_ENTITY_CACHE_SIZE,
+    ttl=settings.APPOINTMENT_ENTITY_CACHE_TTL_SECONDS,
+    stale_ttl=settings.ENTITY_CACHE_STALE_SECONDS,
+)
@@ -0,0 +1,78 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Optional, TypeVar
+import asyncio
+
+R = TypeVar('R')
+
+class ExecutorBusyError(Exception):
+    """Raised when a bounded executor cannot accept more work in time"""
+    pass
+
+class BoundedExecutor:
+    """
+    Thread pool for CPU-heavy work with backpressure.
+    At most `max_pending` jobs may be queued or running; callers wait up to
+    `queue_timeout` seconds for a slot before ExecutorBusyError is raised.
+    """
+    def __init__(
+        self,
+        *,
+        name: str,
+        max_workers: int,
+        max_pending: int,
+        queue_timeout: float,
+    ):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.queue_timeout = queue_timeout
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    def _ensure_started(self) -> None:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix=self.name,
+            )
+            self._slots = asyncio.Semaphore(self.max_pending)
+
+    async def run(self, func: Callable[..., R], *args: Any, timeout: Optional[float] = None, **kwargs: Any) -> R:
+        """
+        Run `func` on the pool and await its result.
+        A job that exceeds `timeout` raises asyncio.TimeoutError; its slot is only
+        released once the thread actually finishes, so the bound stays accurate.
+        """
+        self._ensure_started()
+        loop = asyncio.get_running_loop()
+
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise ExecutorBusyError(f"{self.name} executor is saturated")
+
+        try:
+            future = self._executor.submit(partial(func, *args, **kwargs))
+        except Exception:
+            self._slots.release()
+            raise
+        slots = self._slots
+
+        def release_slot(_):
+            try:
+                loop.call_soon_threadsafe(slots.release)
+            except RuntimeError:
+                # Event loop already closed during shutdown
+                pass
+
+        future.add_done_callback(release_slot)
+
+        return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout)
+
+    def shutdown(self) -> None:
+        """Stop accepting work and release the worker threads"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self._slots = None
@@ -26,6 +26,12 @@ class Settings(BaseSettings):
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+
+    # Password hashing
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 64
+    PASSWORD_HASH_QUEUE_TIMEOUT: float = 5.0
     
     # Supabase
     SUPABASE_URL: str = os.getenv("SUPABASE_URL", "")
@@ -33,6 +39,78 @@ class Settings(BaseSettings):
     SUPABASE_BUCKET_AVATARS: str = "avatars"
     SUPABASE_BUCKET_PRESCRIPTIONS: str = "prescriptions"
 
+    # PostgREST connection pool
+    POSTGREST_MAX_CONNECTIONS: int = 200
+    POSTGREST_MAX_KEEPALIVE_CONNECTIONS: int = 50
+    POSTGREST_KEEPALIVE_EXPIRY: float = 30.0
+    POSTGREST_TIMEOUT: float = 10.0
+    POSTGREST_CONNECT_TIMEOUT: float = 5.0
+    POSTGREST_POOL_TIMEOUT: float = 5.0
+
+    # Bulk writes (CRUDBase.create_many, upsert_many, update_where, delete_many)
+    BULK_WRITE_CHUNK_SIZE: int = 500
+
+    # Pagination
+    PAGINATION_TOTAL_CACHE_SIZE: int = 1024
+    PAGINATION_TOTAL_TTL_SECONDS: float = 300.0
+
+    # Patient typeahead index
+    PATIENT_INDEX_REFRESH_INTERVAL: float = 900.0
+    PATIENT_INDEX_PAGE_SIZE: int = 1000
+
+    # Patient bulk import
+    PATIENT_IMPORT_BATCH_SIZE: int = 1000
+
+    # Appointment scheduling (working hours are in CLINIC_TIMEZONE, Monday is day 0)
+    APPOINTMENT_DEFAULT_DURATION_MINUTES: int = 30
+    APPOINTMENT_SLOT_STEP_MINUTES: int = 15
+    CLINIC_TIMEZONE: str = "UTC"
+    WORKING_HOURS_START: str = "09:00"
+    WORKING_HOURS_END: str = "17:00"
+    WORKING_DAYS: List[int] = [0, 1, 2, 3, 4]
+    AVAILABILITY_MAX_RANGE_DAYS: int = 31
+    AVAILABILITY_REFRESH_INTERVAL: float = 900.0
+    APPOINTMENT_BULK_MAX_SIZE: int = 1000
+    # Scheduled appointments this long past their start are marked completed
+    APPOINTMENT_AUTO_COMPLETE_AFTER_MINUTES: int = 120
+    APPOINTMENT_AUTO_COMPLETE_INTERVAL: float = 300.0
+    APPOINTMENT_AUTO_COMPLETE_BATCH_SIZE: int = 500
+
+    # Appointment change stream (Server-Sent Events)
+    EVENT_STREAM_BUFFER_SIZE: int = 1000
+    EVENT_STREAM_QUEUE_SIZE: int = 100
+    EVENT_STREAM_HEARTBEAT_SECONDS: float = 15.0
+
+    # Appointment reminders
+    REMINDERS_ENABLED: bool = True
+    REMINDER_OFFSETS_MINUTES: List[int] = [1440, 60]
+    REMINDER_LEASE_MINUTES: int = 5
+
+    # Prescriptions
+    PRESCRIPTION_BULK_MAX_SIZE: int = 500
+
+    # AI tools
+    AI_EXECUTOR_WORKERS: int = 4
+    AI_EXECUTOR_MAX_PENDING: int = 256
+    AI_EXECUTOR_QUEUE_TIMEOUT: float = 2.0
+    AI_REQUEST_TIMEOUT: float = 5.0
+    AI_BATCH_MAX_SIZE: int = 1000
+    KNOWLEDGE_BASE_RELOAD_INTERVAL: float = 30.0
+
+    # Authenticated user cache
+    USER_CACHE_MAX_SIZE: int = 10000
+    USER_CACHE_TTL_SECONDS: float = 60.0
+
+    # Entity caches (rows by id, per model; a size of 0 disables one)
+    USER_ENTITY_CACHE_SIZE: int = 1000
+    USER_ENTITY_CACHE_TTL_SECONDS: float = 60.0
+    PATIENT_ENTITY_CACHE_SIZE: int = 10000
+    PATIENT_ENTITY_CACHE_TTL_SECONDS: float = 30.0
+    APPOINTMENT_ENTITY_CACHE_SIZE: int = 10000
+    APPOINTMENT_ENTITY_CACHE_TTL_SECONDS: float = 15.0
+    # Expired entries are served for up to this long while they are refreshed
+    ENTITY_CACHE_STALE_SECONDS: float = 60.0
+
     class Config:
         case_sensitive = True
         env_file = ".env"
@@ -3,7 +3,8 @@ from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 from typing import Optional
 from app.core.config import settings
-from app.db.supabase import get_supabase_client
+from app.core.cache import user_cache
+from app.db.loader import load_row
 from app.models.user import User
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
@@ -28,16 +29,22 @@ async def get_current_user(
     except JWTError:
         raise credentials_exception
     
-    supabase = get_supabase_client()
+    cached_user = user_cache.get(user_id)
+    if cached_user is not None:
+        return cached_user
     
     try:
-        response = supabase.table("users").select("*").eq("id", user_id).execute()
-        user_data = response.data
+        # Shares the request's identity map with the routes' own user lookups
+        user_data = await load_row("users", "id", user_id)
         
-        if not user_data or len(user_data) == 0:
+        if not user_data:
             raise credentials_exception
             
-        return User(**user_data[0])
+        user = User(**user_data)
+        user_cache.set(user_id, user)
+        return user
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
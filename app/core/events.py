@@ -0,0 +1,150 @@
+from typing import Any, Collection, Deque, Dict, List, Optional, Set
+from collections import deque
+from dataclasses import dataclass
+import asyncio
+import itertools
+import json
+import logging
+import uuid
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class Event:
+    """A published event, serialized once for every subscriber"""
+    id: str
+    seq: int
+    type: str
+    topics: Collection[str]
+    payload: str
+
+    def encode(self) -> str:
+        """Server-Sent Events wire format"""
+        return f"id: {self.id}\nevent: {self.type}\ndata: {self.payload}\n\n"
+
+# Tells a client its last event id can't be resumed and it should reload its data
+RESET_EVENT = "event: reset\ndata: {}\n\n"
+
+class Subscription:
+    """
+    One subscriber's bounded queue of encoded events.
+    A subscriber whose queue fills up is closed instead of buffering without
+    limit; it can reconnect with its last event id to catch up.
+    """
+    def __init__(self, topics: Collection[str], max_queue: int):
+        self.topics = frozenset(topics)
+        self.closed = False
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+
+    def push(self, chunk: str) -> bool:
+        """Queue an encoded event; returns False if the subscriber is too slow"""
+        try:
+            self._queue.put_nowait(chunk)
+            return True
+        except asyncio.QueueFull:
+            self.closed = True
+            return False
+
+    def close(self) -> None:
+        self.closed = True
+        try:
+            self._queue.put_nowait(None)
+        except asyncio.QueueFull:
+            pass
+
+    async def get(self) -> Optional[str]:
+        """Next encoded event, or None once the subscription is closed"""
+        if self.closed:
+            return None
+        chunk = await self._queue.get()
+        return None if self.closed else chunk
+
+class EventBroker:
+    """
+    In-process publish/subscribe hub for change events.
+    Events are kept in a ring buffer of the last `buffer_size` events so that
+    reconnecting clients can resume from a Last-Event-ID. Ids carry a
+    per-process prefix; an id from another process (or one that fell out of the
+    buffer) can't be resumed and gets a "reset" event instead.
+    Nothing is shared between processes: with several workers, subscribers
+    miss the changes made through the other workers.
+    """
+    def __init__(self, *, buffer_size: int = 1000, max_queue: int = 100):
+        self.max_queue = max_queue
+        self._prefix = uuid.uuid4().hex[:8]
+        self._seq = itertools.count(1)
+        self._buffer: Deque[Event] = deque(maxlen=buffer_size)
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+
+    def publish(self, event_type: str, data: Any, topics: Collection[str]) -> Event:
+        """Send an event to every subscriber of any of `topics`"""
+        seq = next(self._seq)
+        event = Event(
+            id=f"{self._prefix}-{seq}",
+            seq=seq,
+            type=event_type,
+            topics=tuple(topics),
+            payload=json.dumps(data, separators=(",", ":"), default=str),
+        )
+        self._buffer.append(event)
+        chunk = event.encode()
+
+        delivered: Set[Subscription] = set()
+        for topic in event.topics:
+            for subscription in tuple(self._subscribers.get(topic, ())):
+                if subscription in delivered:
+                    continue
+                delivered.add(subscription)
+                if not subscription.push(chunk):
+                    logger.warning("Dropping slow event stream subscriber")
+                    self.unsubscribe(subscription)
+        return event
+
+    def subscribe(self, topics: Collection[str], last_event_id: Optional[str] = None) -> Subscription:
+        """Register a subscriber, first replaying the events it missed"""
+        subscription = Subscription(topics, self.max_queue)
+        if last_event_id:
+            missed = self._since(last_event_id)
+            if missed is None:
+                subscription.push(RESET_EVENT)
+            else:
+                for event in missed:
+                    if subscription.topics.intersection(event.topics) and not subscription.push(event.encode()):
+                        # Too far behind to replay; start over
+                        subscription = Subscription(topics, self.max_queue)
+                        subscription.push(RESET_EVENT)
+                        break
+        for topic in subscription.topics:
+            self._subscribers.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        for topic in subscription.topics:
+            subscribers = self._subscribers.get(topic)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[topic]
+        subscription.close()
+
+    def _since(self, last_event_id: str) -> Optional[List[Event]]:
+        """Buffered events after `last_event_id`, or None if they can't be recovered"""
+        prefix, _, seq = last_event_id.partition("-")
+        if prefix != self._prefix or not seq.isdigit():
+            return None
+        if not self._buffer:
+            return []
+        first = self._buffer[0].seq
+        if int(seq) + 1 < first:
+            return None
+        return list(itertools.islice(self._buffer, max(int(seq) + 1 - first, 0), None))
+
+    def close(self) -> None:
+        """Close every subscription (on shutdown)"""
+        for subscribers in list(self._subscribers.values()):
+            for subscription in list(subscribers):
+                self.unsubscribe(subscription)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len({subscription for subscribers in self._subscribers.values() for subscription in subscribers})
@@ -0,0 +1,78 @@
+from abc import ABC, abstractmethod
+from typing import Any, List, Optional, Tuple
+from app.core.tasks import PeriodicTask
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+class BackgroundIndex(ABC):
+    """
+    Base class for in-process indexes loaded from the database.
+    The first load runs in the background at startup and the index is rebuilt
+    every `refresh_interval` seconds to pick up writes made by other workers.
+    Subclasses implement `_load` (build a fresh state) and `_install` (make it
+    current), and call `_record` from their write methods so that writes made
+    while a rebuild is running are replayed onto the new state.
+    """
+    name = "index"
+
+    def __init__(self, *, refresh_interval: float = 0):
+        self.ready = False
+        self._journal: Optional[List[Tuple[str, tuple]]] = None
+        self._build_task: Optional[asyncio.Task] = None
+        self._refresher = PeriodicTask(f"{self.name}-refresh", refresh_interval, self.rebuild)
+
+    @abstractmethod
+    async def _load(self) -> Any:
+        """Build a fresh index state from the database"""
+
+    @abstractmethod
+    def _install(self, state: Any) -> None:
+        """Make a state returned by `_load` the current one"""
+
+    def _record(self, method: str, *args: Any) -> None:
+        """Remember a write for replay if a rebuild is in progress"""
+        if self._journal is not None:
+            self._journal.append((method, args))
+
+    async def rebuild(self) -> None:
+        """Reload the whole index from the database and swap it in"""
+        if self._journal is not None:
+            return
+        self._journal = []
+        try:
+            state = await self._load()
+            journal, self._journal = self._journal, None
+            self._install(state)
+            for method, args in journal:
+                getattr(self, method)(*args)
+            self.ready = True
+            logger.info("Rebuilt %s", self.name)
+        finally:
+            self._journal = None
+
+    async def _initial_build(self) -> None:
+        try:
+            await self.rebuild()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Failed to build %s", self.name)
+
+    def start(self) -> None:
+        """Build the index in the background and start the periodic rebuild"""
+        if self._build_task is None:
+            self._build_task = asyncio.create_task(self._initial_build(), name=f"{self.name}-build")
+        self._refresher.start()
+
+    async def stop(self) -> None:
+        """Stop building and refreshing the index"""
+        if self._build_task is not None:
+            self._build_task.cancel()
+            try:
+                await self._build_task
+            except asyncio.CancelledError:
+                pass
+            self._build_task = None
+        await self._refresher.stop()
@@ -1,10 +1,27 @@
 from datetime import datetime, timedelta
-from typing import Any, Optional, Union
+from typing import Any, Optional, Tuple, Union
 from jose import jwt
 from passlib.context import CryptContext
 from app.core.config import settings
+from app.core.concurrency import BoundedExecutor, ExecutorBusyError
+from app.utils.exceptions import ServiceUnavailableException
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hashes whose cost differs from BCRYPT_ROUNDS are reported as needing an update
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+)
+
+# bcrypt releases the GIL, so a thread pool keeps hashing off the event loop
+password_hash_executor = BoundedExecutor(
+    name="password-hash",
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+    queue_timeout=settings.PASSWORD_HASH_QUEUE_TIMEOUT,
+)
 
 def create_access_token(subject: Union[str, Any], expires_delta: Optional[timedelta] = None) -> str:
     if expires_delta:
@@ -26,4 +43,22 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
\ No newline at end of file
+    return pwd_context.hash(password)
+
+async def hash_password(password: str) -> str:
+    """Hash a password on the password hashing pool"""
+    try:
+        return await password_hash_executor.run(pwd_context.hash, password)
+    except ExecutorBusyError:
+        raise ServiceUnavailableException("Too many concurrent password operations, please retry")
+
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password on the password hashing pool.
+    Returns (valid, new_hash); new_hash is set when the stored hash uses outdated
+    parameters and should be replaced.
+    """
+    try:
+        return await password_hash_executor.run(pwd_context.verify_and_update, plain_password, hashed_password)
+    except ExecutorBusyError:
+        raise ServiceUnavailableException("Too many concurrent password operations, please retry")
@@ -0,0 +1,48 @@
+from typing import Awaitable, Callable, Dict, Generic, Hashable, TypeVar
+import asyncio
+
+V = TypeVar('V')
+
+class _Call:
+    """One in-flight call and the number of callers waiting on it"""
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.waiters = 0
+
+class SingleFlight(Generic[V]):
+    """
+    Coalesces concurrent calls with the same key into one in-flight call.
+    Every caller gets the shared result (or exception). A cancelled caller
+    only stops waiting; the shared call is cancelled once no caller is left.
+    """
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[V]]) -> V:
+        """Await `func()`, or the in-flight call already running for `key`"""
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(func()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._discard(key, call))
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # Every caller gave up; later callers start a new call
+                self._discard(key, call)
+                call.task.cancel()
+
+    def forget(self) -> None:
+        """Make later callers start new calls (after a write); current callers still share theirs"""
+        self._calls.clear()
+
+    def _discard(self, key: Hashable, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._calls)
@@ -0,0 +1,41 @@
+from typing import Awaitable, Callable, Optional
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+class PeriodicTask:
+    """
+    Background asyncio task that awaits `func` every `interval` seconds.
+    Errors are logged and the loop keeps running; an interval <= 0 disables it.
+    """
+    def __init__(self, name: str, interval: float, func: Callable[[], Awaitable[None]]):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Start the loop (no-op if disabled or already running)"""
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run(), name=self.name)
+
+    async def stop(self) -> None:
+        """Cancel the loop and wait for it to finish"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.func()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Periodic task %s failed", self.name)
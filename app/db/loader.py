@@ -0,0 +1,116 @@
+from typing import Any, Dict, Optional, Set, Tuple
+from contextvars import ContextVar
+from app.db.supabase import get_async_postgrest_client
+import asyncio
+
+# Largest `in.(...)` list sent in one query
+MAX_BATCH_SIZE = 500
+
+Row = Optional[Dict[str, Any]]
+RowKey = Tuple[str, str, str]
+
+class RequestScope:
+    """
+    Identity map and DataLoader for one request.
+    Lookups of a row by (table, field, value) are cached for the rest of the
+    request, and lookups issued in the same event loop tick are sent as a
+    single `field=in.(...)` query per table and field.
+    """
+    def __init__(self):
+        self._rows: Dict[RowKey, "asyncio.Future[Row]"] = {}
+        self._pending: Dict[Tuple[str, str], Dict[str, "asyncio.Future[Row]"]] = {}
+        # Running batch fetches; the event loop only keeps weak references to tasks
+        self._tasks: Set[asyncio.Task] = set()
+
+    def load(self, table_name: str, field: str, value: Any) -> "asyncio.Future[Row]":
+        """Future resolving to the first row with `field` = `value` (None if missing)"""
+        key = (table_name, field, str(value))
+        future = self._rows.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._rows[key] = future
+            batch = self._pending.get((table_name, field))
+            if batch is None:
+                batch = self._pending[(table_name, field)] = {}
+                loop.call_soon(self._dispatch, table_name, field)
+            batch[key[2]] = future
+        return future
+
+    def prime(self, table_name: str, row: Dict[str, Any]) -> None:
+        """Record a row just written so later lookups by id don't refetch it"""
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(row)
+        self._rows[(table_name, "id", str(row["id"]))] = future
+
+    def evict(self, table_name: str) -> None:
+        """Forget every cached row of a table after a write"""
+        for key in [key for key in self._rows if key[0] == table_name]:
+            del self._rows[key]
+
+    def _dispatch(self, table_name: str, field: str) -> None:
+        batch = self._pending.pop((table_name, field))
+        values = list(batch)
+        for i in range(0, len(values), MAX_BATCH_SIZE):
+            chunk = {value: batch[value] for value in values[i:i + MAX_BATCH_SIZE]}
+            task = asyncio.ensure_future(self._fetch(table_name, field, chunk))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _fetch(self, table_name: str, field: str, batch: Dict[str, "asyncio.Future[Row]"]) -> None:
+        try:
+            db = get_async_postgrest_client()
+            query = db.from_(table_name).select("*")
+            if len(batch) == 1:
+                query = query.eq(field, next(iter(batch)))
+            else:
+                query = query.in_(field, list(batch))
+            response = await query.execute()
+        except Exception as e:
+            for value, future in batch.items():
+                # Don't keep the failure around; a later lookup tries again
+                self._rows.pop((table_name, field, value), None)
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        found: Dict[str, Dict[str, Any]] = {}
+        for row in response.data or []:
+            found.setdefault(str(row.get(field)), row)
+        for value, future in batch.items():
+            if not future.done():
+                future.set_result(found.get(value))
+
+_request_scope: ContextVar[Optional[RequestScope]] = ContextVar("request_scope", default=None)
+
+def get_request_scope() -> Optional[RequestScope]:
+    """The current request's scope, or None outside of a request"""
+    return _request_scope.get()
+
+async def load_row(table_name: str, field: str, value: Any) -> Row:
+    """
+    Fetch the first row of `table_name` with `field` = `value`, through the
+    request scope when there is one
+    """
+    scope = get_request_scope()
+    if scope is not None:
+        row = await scope.load(table_name, field, value)
+        # Callers get their own copy of the shared row
+        return dict(row) if row is not None else None
+    response = await get_async_postgrest_client().from_(table_name).select("*").eq(field, value).execute()
+    return response.data[0] if response.data else None
+
+class RequestScopeMiddleware:
+    """ASGI middleware giving every HTTP request its own RequestScope"""
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = _request_scope.set(RequestScope())
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_scope.reset(token)
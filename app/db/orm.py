@@ -1,37 +1,321 @@
 from sqlmodel import Field, Session, SQLModel, create_engine, select
-from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union
+from fastapi import HTTPException
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Generic, Iterable, List, Optional, Sequence, Tuple, Type, TypeVar, Union
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from fastapi.encoders import jsonable_encoder
+from postgrest.exceptions import APIError
+from postgrest.types import CountMethod, ReturnMethod
+from pydantic import ValidationError, parse_obj_as
+from app.core.cache import CachePolicy, TTLCache, get_entity_cache
 from app.core.config import settings
-from app.db.supabase import get_supabase_client
+from app.core.singleflight import SingleFlight
+from app.db.loader import get_request_scope, load_row
+from app.db.pagination import Page, fetch_page
+from app.db.supabase import get_async_postgrest_client
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
 
 T = TypeVar('T', bound=SQLModel)
 
+# A filter is (column, operator, value), e.g. ("doctor_id", "eq", id) or
+# ("appointment_date", "gte", from_date). The "or" operator takes a raw
+# PostgREST logical expression as value and ignores the column; "ov" takes a
+# range literal such as "[2025-01-01T09:00:00+00:00,2025-01-01T10:00:00+00:00)".
+Filter = Tuple[str, str, Any]
+
+# Postgres error codes raised when a write breaks a unique or exclusion constraint
+CONSTRAINT_VIOLATION_CODES = ("23505", "23P01")
+
+class ConstraintViolation(Exception):
+    """A write rejected by a unique or exclusion constraint"""
+    def __init__(self, table_name: str, error: APIError):
+        self.code = error.code
+        self.details = error.details
+        super().__init__(f"Constraint violation on {table_name}: {error.message}")
+
+@dataclass
+class ChunkError:
+    """A chunk of a bulk write that was rejected"""
+    offset: int  # index of the chunk's first item in the input
+    size: int
+    error: str
+    code: Optional[str] = None
+
+@dataclass
+class BulkResult:
+    """Outcome of a chunked bulk write"""
+    # Written rows (empty when the write returned minimal responses)
+    rows: List[Dict[str, Any]] = field(default_factory=list)
+    # Input items in chunks that succeeded; for update_where, rows updated
+    # (counted by the database, so also with minimal responses)
+    count: int = 0
+    errors: List[ChunkError] = field(default_factory=list)
+
+    def raise_for_errors(self) -> "BulkResult":
+        if self.errors:
+            raise BulkWriteError(self.errors)
+        return self
+
+class BulkWriteError(Exception):
+    """Some chunks of a bulk write failed"""
+    def __init__(self, errors: List[ChunkError]):
+        self.errors = errors
+        super().__init__(f"{len(errors)} chunk(s) of a bulk write failed: {errors[0].error}")
+
+def validate_many(schema: Type[SQLModel], items: Sequence[Any]) -> Tuple[List[Tuple[int, SQLModel]], List[Tuple[int, str]]]:
+    """
+    Validate a batch against `schema` in one pass.
+    Returns the (index, model) of valid items and the (index, message) of invalid ones.
+    """
+    try:
+        return list(enumerate(parse_obj_as(List[schema], list(items)))), []
+    except ValidationError as e:
+        messages: Dict[int, List[str]] = {}
+        for error in e.errors():
+            loc = [part for part in error["loc"] if part != "__root__"]
+            messages.setdefault(loc[0], []).append(f"{'.'.join(str(part) for part in loc[1:])}: {error['msg']}")
+    indexes = [i for i in range(len(items)) if i not in messages]
+    models = parse_obj_as(List[schema], [items[i] for i in indexes]) if indexes else []
+    invalid = [(i, "; ".join(message)) for i, message in sorted(messages.items())]
+    return list(zip(indexes, models)), invalid
+
+# Estimated row counts per (table, filters), shared by all CRUDBase instances
+estimated_total_cache: TTLCache = TTLCache(
+    max_size=settings.PAGINATION_TOTAL_CACHE_SIZE,
+    ttl=settings.PAGINATION_TOTAL_TTL_SECONDS,
+)
+
+# Background refreshes of stale entity cache entries, one per (table, id)
+_revalidations: Dict[Tuple[str, str], asyncio.Task] = {}
+
+# Coalesced list reads per table, shared by all CRUDBase instances of a table
+_read_flights: Dict[str, SingleFlight] = {}
+
+def apply_filters(query, filters: Optional[Sequence[Filter]]):
+    """Apply (column, operator, value) filters to a PostgREST query builder"""
+    for column, operator, value in filters or ():
+        if isinstance(value, (datetime, date)):
+            value = value.isoformat()
+        if operator == "or":
+            query = query.or_(value)
+        elif operator == "in":
+            query = query.in_(column, list(value))
+        elif operator == "ov":
+            query = query.filter(column, "ov", value)
+        else:
+            query = getattr(query, operator)(column, value)
+    return query
+
+def filters_key(filters: Optional[Sequence[Filter]]) -> Tuple:
+    """Normalized, hashable representation of a filter list"""
+    return tuple(sorted(
+        (column, operator, tuple(value) if isinstance(value, (list, tuple, set)) else str(value))
+        for column, operator, value in filters or ()
+    ))
+
 class CRUDBase(Generic[T]):
     """
     Base class for CRUD operations using SQLModel with Supabase.
+    All queries go through the shared asynchronous PostgREST client.
+    With a `cache` policy, rows fetched by id are kept in a per-table LRU/TTL
+    cache that this process's writes keep current; expired entries are served
+    while a background task refreshes them.
     """
-    def __init__(self, model: Type[T]):
+    def __init__(
+        self,
+        model: Type[T],
+        *,
+        order_by: Sequence[str] = ("created_at", "id"),
+        cache: Optional[CachePolicy] = None,
+    ):
         self.model = model
-        self.supabase = get_supabase_client()
         self.table_name = model.__tablename__
+        # Keyset pagination sort key; must be unique and backed by an index
+        self.order_by = tuple(order_by)
+        self.cache: Optional[TTLCache] = get_entity_cache(self.table_name, cache) if cache else None
+        self.reads: SingleFlight = _read_flights.setdefault(self.table_name, SingleFlight())
+
+    def table(self):
+        """Return a query builder for this model's table"""
+        return get_async_postgrest_client().from_(self.table_name)
+
+    def _written(self, row: Optional[Dict[str, Any]], id: Any = None) -> None:
+        """Keep the request's identity map, the entity cache and coalesced reads consistent after a write"""
+        # Reads started before the write must not be joined by later readers
+        self.reads.forget()
+        scope = get_request_scope()
+        if scope is not None:
+            scope.evict(self.table_name)
+            if row is not None:
+                scope.prime(self.table_name, row)
+        if self.cache is not None:
+            key = str(row["id"] if row is not None else id)
+            if row is not None:
+                self.cache.set(key, dict(row))
+            else:
+                self.cache.invalidate(key)
+
+    def _written_many(self, rows: Sequence[Dict[str, Any]], ids: Iterable[Any] = (), *, unknown: bool = False) -> None:
+        """
+        Like `_written` for a bulk write: cache the returned `rows`, drop `ids`,
+        or every cached row of the table if the written rows are `unknown`
+        """
+        self.reads.forget()
+        scope = get_request_scope()
+        if scope is not None:
+            scope.evict(self.table_name)
+        if self.cache is not None:
+            if unknown:
+                self.cache.clear()
+            for id in ids:
+                self.cache.invalidate(str(id))
+            for row in rows:
+                self.cache.set(str(row["id"]), dict(row))
+
+    def _revalidate(self, key: str, stale: Dict[str, Any]) -> None:
+        """Refresh a stale cache entry in the background (once per id)"""
+        task_key = (self.table_name, key)
+        if task_key not in _revalidations:
+            _revalidations[task_key] = asyncio.create_task(self._refresh(key, stale))
+
+    async def _refresh(self, key: str, stale: Dict[str, Any]) -> None:
+        try:
+            response = await self.table().select("*").eq("id", key).execute()
+            # A write in the meantime already stored a newer row
+            if self.cache.peek(key) is stale:
+                if response.data:
+                    self.cache.set(key, response.data[0])
+                else:
+                    self.cache.invalidate(key)
+        except Exception:
+            # Keep serving the stale row until its stale window ends
+            logger.warning("Failed to refresh cached %s %s", self.table_name, key, exc_info=True)
+        finally:
+            _revalidations.pop((self.table_name, key), None)
 
     async def get(self, id: Any) -> Optional[T]:
-        """Get a single record by ID"""
+        """Get a single record by ID (cached, deduplicated and batched per request)"""
         try:
-            response = self.supabase.table(self.table_name).select("*").eq("id", id).execute()
-            if response.data and len(response.data) > 0:
-                return self.model(**response.data[0])
-            return None
+            if self.cache is not None:
+                cached = self.cache.lookup(str(id))
+                if cached is not None:
+                    row, fresh = cached
+                    if not fresh:
+                        self._revalidate(str(id), row)
+                    return self.model(**row)
+            row = await load_row(self.table_name, "id", id)
+            if row and self.cache is not None:
+                self.cache.set(str(id), dict(row))
+            return self.model(**row) if row else None
         except Exception as e:
             raise Exception(f"Error retrieving {self.table_name} with id {id}: {str(e)}")
 
-    async def get_multi(self, *, skip: int = 0, limit: int = 100) -> List[T]:
+    async def get_multi(
+        self,
+        *,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        filters: Optional[Sequence[Filter]] = None,
+    ) -> List[T]:
         """Get multiple records with pagination"""
+        page = await self.get_page(skip=skip, limit=limit, cursor=cursor, filters=filters)
+        return page.items
+
+    async def fetch_page(
+        self,
+        *,
+        filters: Optional[Sequence[Filter]] = None,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        skip: int = 0,
+        columns: str = "*",
+    ) -> Page[Dict[str, Any]]:
+        """
+        Get a page of raw rows ordered by the keyset sort key.
+        Identical concurrent calls share one upstream query; each caller gets
+        its own copy of the rows.
+        """
+        key = ("page", columns, filters_key(filters), self.order_by, cursor, limit, skip)
+
+        async def load() -> Page[Dict[str, Any]]:
+            query = apply_filters(self.table().select(columns), filters)
+            return await fetch_page(query, order_by=self.order_by, cursor=cursor, limit=limit, skip=skip)
+
+        page = await self.reads.do(key, load)
+        return Page(items=[dict(row) for row in page.items], next_cursor=page.next_cursor, total=page.total)
+
+    async def iterate(
+        self,
+        *,
+        filters: Optional[Sequence[Filter]] = None,
+        batch_size: int = 1000,
+        columns: str = "*",
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield every matching raw row in keyset order, `batch_size` rows per query.
+        The next page is fetched while the current one is consumed, so at most
+        two pages are held at a time. `columns` must include the sort key.
+        """
+        pending = asyncio.ensure_future(self.fetch_page(filters=filters, limit=batch_size, columns=columns))
+        try:
+            while pending is not None:
+                page = await pending
+                pending = None
+                if page.next_cursor:
+                    pending = asyncio.ensure_future(
+                        self.fetch_page(filters=filters, cursor=page.next_cursor, limit=batch_size, columns=columns)
+                    )
+                for row in page.items:
+                    yield row
+        finally:
+            if pending is not None:
+                pending.cancel()
+
+    async def get_page(
+        self,
+        *,
+        filters: Optional[Sequence[Filter]] = None,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        skip: int = 0,
+        include_total: bool = False,
+    ) -> Page[T]:
+        """
+        Get a page of records using keyset pagination.
+        Pass the returned `next_cursor` back as `cursor` to fetch the next page.
+        """
         try:
-            response = self.supabase.table(self.table_name).select("*").range(skip, skip + limit - 1).execute()
-            return [self.model(**item) for item in response.data]
+            page = await self.fetch_page(filters=filters, cursor=cursor, limit=limit, skip=skip)
+            total = await self.estimate_total(filters=filters) if include_total else None
+            return Page(
+                items=[self.model(**item) for item in page.items],
+                next_cursor=page.next_cursor,
+                total=total,
+            )
+        except HTTPException:
+            raise
         except Exception as e:
             raise Exception(f"Error retrieving multiple {self.table_name}: {str(e)}")
 
+    async def estimate_total(self, *, filters: Optional[Sequence[Filter]] = None) -> Optional[int]:
+        """Get the planner-estimated number of matching records (cached)"""
+        key = (self.table_name, filters_key(filters))
+        total = estimated_total_cache.get(key)
+        if total is None:
+            async def load() -> Optional[int]:
+                query = apply_filters(self.table().select("id", count="estimated"), filters)
+                response = await query.limit(1).execute()
+                return response.count
+
+            total = await self.reads.do(("count", key[1]), load)
+            if total is not None:
+                estimated_total_cache.set(key, total)
+        return total
+
     async def create(self, *, obj_in: Union[Dict[str, Any], T]) -> T:
         """Create a new record"""
         try:
@@ -39,9 +323,15 @@ class CRUDBase(Generic[T]):
                 obj_data = obj_in
             else:
                 obj_data = obj_in.dict(exclude_unset=True)
+            obj_data = jsonable_encoder(obj_data)
                 
-            response = self.supabase.table(self.table_name).insert(obj_data).execute()
+            response = await self.table().insert(obj_data).execute()
+            self._written(response.data[0])
             return self.model(**response.data[0])
+        except APIError as e:
+            if e.code in CONSTRAINT_VIOLATION_CODES:
+                raise ConstraintViolation(self.table_name, e)
+            raise Exception(f"Error creating {self.table_name}: {str(e)}")
         except Exception as e:
             raise Exception(f"Error creating {self.table_name}: {str(e)}")
 
@@ -52,28 +342,174 @@ class CRUDBase(Generic[T]):
                 update_data = obj_in
             else:
                 update_data = obj_in.dict(exclude_unset=True)
+            update_data = jsonable_encoder(update_data)
                 
-            response = self.supabase.table(self.table_name).update(update_data).eq("id", id).execute()
+            response = await self.table().update(update_data).eq("id", id).execute()
+            self._written(response.data[0] if response.data else None, id)
             if response.data and len(response.data) > 0:
                 return self.model(**response.data[0])
             return None
+        except APIError as e:
+            if e.code in CONSTRAINT_VIOLATION_CODES:
+                raise ConstraintViolation(self.table_name, e)
+            raise Exception(f"Error updating {self.table_name} with id {id}: {str(e)}")
         except Exception as e:
             raise Exception(f"Error updating {self.table_name} with id {id}: {str(e)}")
 
     async def delete(self, *, id: Any) -> bool:
         """Delete a record"""
         try:
-            self.supabase.table(self.table_name).delete().eq("id", id).execute()
+            await self.table().delete().eq("id", id).execute()
+            self._written(None, id)
             return True
         except Exception as e:
             raise Exception(f"Error deleting {self.table_name} with id {id}: {str(e)}")
 
     async def get_by_field(self, field: str, value: Any) -> Optional[T]:
-        """Get a record by a specific field value"""
+        """Get a record by a specific field value (deduplicated and batched per request)"""
         try:
-            response = self.supabase.table(self.table_name).select("*").eq(field, value).execute()
-            if response.data and len(response.data) > 0:
-                return self.model(**response.data[0])
-            return None
+            row = await load_row(self.table_name, field, value)
+            return self.model(**row) if row else None
         except Exception as e:
-            raise Exception(f"Error retrieving {self.table_name} with {field}={value}: {str(e)}")
\ No newline at end of file
+            raise Exception(f"Error retrieving {self.table_name} with {field}={value}: {str(e)}")
+
+    def _encode_many(self, objs: Sequence[Union[Dict[str, Any], T]]) -> List[Dict[str, Any]]:
+        """JSON-encode a batch of dicts or models in one pass"""
+        return jsonable_encoder([obj if isinstance(obj, dict) else obj.dict(exclude_unset=True) for obj in objs])
+
+    async def _write_chunks(
+        self,
+        items: List[Any],
+        write: Callable[[List[Any]], Awaitable[Any]],
+        *,
+        chunk_size: Optional[int],
+        concurrency: int,
+        count_affected: bool = False,
+    ) -> BulkResult:
+        """
+        Run `write` over chunks of `items`, at most `concurrency` at a time.
+        With `count_affected`, `count` adds up the responses' row counts instead
+        of the chunk sizes.
+        """
+        chunk_size = chunk_size or settings.BULK_WRITE_CHUNK_SIZE
+        semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+        async def run(offset: int):
+            chunk = items[offset:offset + chunk_size]
+            async with semaphore:
+                try:
+                    response = await write(chunk)
+                except APIError as e:
+                    return 0, None, ChunkError(offset, len(chunk), e.message, e.code)
+                except Exception as e:
+                    return 0, None, ChunkError(offset, len(chunk), str(e))
+            return (response.count or 0) if count_affected else len(chunk), response.data or [], None
+
+        result = BulkResult()
+        for count, rows, error in await asyncio.gather(*(run(offset) for offset in range(0, len(items), chunk_size))):
+            if error is not None:
+                result.errors.append(error)
+                continue
+            result.rows.extend(rows)
+            result.count += count
+        return result
+
+    async def create_many(
+        self,
+        objs: Sequence[Union[Dict[str, Any], T]],
+        *,
+        chunk_size: Optional[int] = None,
+        concurrency: int = 1,
+        returning: ReturnMethod = ReturnMethod.representation,
+    ) -> BulkResult:
+        """
+        Insert records with multi-row INSERTs of at most `chunk_size` rows.
+        All records should have the same fields; a failing chunk is reported
+        in the result and doesn't stop the others.
+        """
+        rows = self._encode_many(objs)
+        result = await self._write_chunks(
+            rows,
+            lambda chunk: self.table().insert(chunk, returning=returning).execute(),
+            chunk_size=chunk_size,
+            concurrency=concurrency,
+        )
+        self._written_many(result.rows)
+        return result
+
+    async def upsert_many(
+        self,
+        objs: Sequence[Union[Dict[str, Any], T]],
+        *,
+        on_conflict: str = "id",
+        ignore_duplicates: bool = False,
+        chunk_size: Optional[int] = None,
+        concurrency: int = 1,
+        returning: ReturnMethod = ReturnMethod.representation,
+    ) -> BulkResult:
+        """Insert records, or update those clashing on the `on_conflict` columns, in chunks"""
+        rows = self._encode_many(objs)
+        result = await self._write_chunks(
+            rows,
+            lambda chunk: self.table().upsert(
+                chunk, on_conflict=on_conflict, ignore_duplicates=ignore_duplicates, returning=returning
+            ).execute(),
+            chunk_size=chunk_size,
+            concurrency=concurrency,
+        )
+        self._written_many(result.rows, [row["id"] for row in rows if "id" in row])
+        return result
+
+    async def update_where(
+        self,
+        filters: Sequence[Filter],
+        values: Union[Dict[str, Any], T],
+        *,
+        chunk_size: Optional[int] = None,
+        concurrency: int = 1,
+        returning: ReturnMethod = ReturnMethod.representation,
+    ) -> BulkResult:
+        """
+        Set `values` on every record matching `filters` with one UPDATE.
+        A long "in" filter is split into chunks, one UPDATE each.
+        """
+        data = jsonable_encoder(values if isinstance(values, dict) else values.dict(exclude_unset=True))
+        filters = list(filters)
+        in_filters = [i for i, (_, operator, _) in enumerate(filters) if operator == "in"]
+        position = max(in_filters, key=lambda i: len(filters[i][2]), default=None)
+        if position is None:
+            # Nothing to split on
+            column, values_in = None, [None]
+            chunk_size = 1
+        else:
+            column, _, values_in = filters.pop(position)
+            values_in = list(values_in)
+
+        def write(chunk: List[Any]):
+            chunk_filters = filters if column is None else [*filters, (column, "in", chunk)]
+            query = self.table().update(data, count=CountMethod.exact, returning=returning)
+            return apply_filters(query, chunk_filters).execute()
+
+        result = await self._write_chunks(
+            values_in, write, chunk_size=chunk_size, concurrency=concurrency, count_affected=True
+        )
+        self._written_many(result.rows, unknown=returning == ReturnMethod.minimal)
+        return result
+
+    async def delete_many(
+        self,
+        ids: Sequence[Any],
+        *,
+        chunk_size: Optional[int] = None,
+        concurrency: int = 1,
+    ) -> BulkResult:
+        """Delete records by id with one `id=in.(...)` DELETE per chunk"""
+        ids = [str(id) for id in ids]
+        result = await self._write_chunks(
+            ids,
+            lambda chunk: self.table().delete(returning=ReturnMethod.minimal).in_("id", chunk).execute(),
+            chunk_size=chunk_size,
+            concurrency=concurrency,
+        )
+        self._written_many([], ids)
+        return result
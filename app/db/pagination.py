@@ -0,0 +1,95 @@
+from dataclasses import dataclass
+from typing import Any, Dict, Generic, List, Optional, Sequence, TypeVar
+from fastapi import Request, Response
+from app.utils.exceptions import ValidationException
+import base64
+import json
+
+T = TypeVar('T')
+
+# Response headers carrying pagination metadata (exposed to browsers via CORS)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+TOTAL_COUNT_HEADER = "X-Total-Count"
+PAGINATION_HEADERS = ["Link", NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER]
+
+# Largest page the list endpoints serve
+MAX_PAGE_SIZE = 100
+
+@dataclass
+class Page(Generic[T]):
+    """A page of results plus the opaque cursor of the following page"""
+    items: List[T]
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None
+
+def encode_cursor(row: Dict[str, Any], order_by: Sequence[str]) -> str:
+    """Encode the sort key of the last row of a page as an opaque cursor"""
+    payload = json.dumps([row.get(column) for column in order_by], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, order_by: Sequence[str]) -> List[Any]:
+    """Decode a cursor produced by encode_cursor for the same sort key"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise ValidationException("Invalid pagination cursor")
+    if not isinstance(values, list) or len(values) != len(order_by) or None in values:
+        raise ValidationException("Invalid pagination cursor")
+    return values
+
+def _quote(value: Any) -> str:
+    """Quote a value for use inside a PostgREST logical filter"""
+    text = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{text}"'
+
+def keyset_filter(order_by: Sequence[str], values: Sequence[Any]) -> str:
+    """
+    Build the PostgREST `or` filter selecting rows strictly after `values`, i.e.
+    (a > va) OR (a = va AND b > vb) OR ... for an ascending sort on `order_by`.
+    """
+    clauses = []
+    for i, column in enumerate(order_by):
+        conditions = [f"{c}.eq.{_quote(v)}" for c, v in zip(order_by[:i], values[:i])]
+        conditions.append(f"{column}.gt.{_quote(values[i])}")
+        clauses.append(conditions[0] if len(conditions) == 1 else f"and({','.join(conditions)})")
+    return ",".join(clauses)
+
+async def fetch_page(
+    query,
+    *,
+    order_by: Sequence[str],
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    skip: int = 0,
+) -> Page[Dict[str, Any]]:
+    """
+    Execute a PostgREST select query one page at a time.
+    Pages are addressed by cursor (keyset); `skip` is only honoured for the
+    first page and exists for backwards compatibility with offset clients.
+    """
+    if limit < 1:
+        raise ValueError(f"Page limit must be at least 1, got {limit}")
+    if cursor:
+        query = query.or_(keyset_filter(order_by, decode_cursor(cursor, order_by)))
+    for column in order_by:
+        query = query.order(column)
+
+    # Fetch one extra row to know whether another page follows
+    if skip and not cursor:
+        response = await query.range(skip, skip + limit).execute()
+    else:
+        response = await query.limit(limit + 1).execute()
+
+    rows = response.data or []
+    next_cursor = encode_cursor(rows[limit - 1], order_by) if len(rows) > limit else None
+    return Page(items=rows[:limit], next_cursor=next_cursor)
+
+def set_pagination_headers(response: Response, request: Request, page: Page) -> None:
+    """Advertise the next page through Link / X-Next-Cursor and the estimated total"""
+    if page.next_cursor:
+        next_url = request.url.remove_query_params("skip").include_query_params(cursor=page.next_cursor)
+        response.headers["Link"] = f'<{next_url}>; rel="next"'
+        response.headers[NEXT_CURSOR_HEADER] = page.next_cursor
+    if page.total is not None:
+        response.headers[TOTAL_COUNT_HEADER] = str(page.total)
@@ -1,6 +1,8 @@
 from supabase import create_client, Client
+from postgrest import AsyncPostgrestClient
 from app.core.config import settings
 from functools import lru_cache
+import httpx
 
 @lru_cache()
 def get_supabase_client() -> Client:
@@ -10,13 +12,52 @@ def get_supabase_client() -> Client:
     """
     try:
         supabase: Client = create_client(
-            settings.SUPABASE_URL, 
+            settings.SUPABASE_URL,
             settings.SUPABASE_KEY
         )
         return supabase
     except Exception as e:
         raise Exception(f"Failed to initialize Supabase client: {str(e)}")
 
+@lru_cache()
+def get_async_postgrest_client() -> AsyncPostgrestClient:
+    """
+    Create and return the shared asynchronous PostgREST client.
+    All requests in a worker share one pooled httpx session with keep-alive
+    connections, so database calls never block the event loop.
+    """
+    try:
+        base_url = f"{settings.SUPABASE_URL}/rest/v1"
+        headers = {
+            "apiKey": settings.SUPABASE_KEY,
+            "Authorization": f"Bearer {settings.SUPABASE_KEY}",
+        }
+        # One session with explicit pool limits, handed to the client (which closes it in aclose)
+        pooled = httpx.AsyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=httpx.Timeout(
+                settings.POSTGREST_TIMEOUT,
+                connect=settings.POSTGREST_CONNECT_TIMEOUT,
+                pool=settings.POSTGREST_POOL_TIMEOUT,
+            ),
+            limits=httpx.Limits(
+                max_connections=settings.POSTGREST_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.POSTGREST_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.POSTGREST_KEEPALIVE_EXPIRY,
+            ),
+        )
+        client = AsyncPostgrestClient(base_url, headers=headers, http_client=pooled)
+        return client
+    except Exception as e:
+        raise Exception(f"Failed to initialize async PostgREST client: {str(e)}")
+
+async def close_async_postgrest_client() -> None:
+    """Close the pooled PostgREST session (called on application shutdown)"""
+    if get_async_postgrest_client.cache_info().currsize:
+        await get_async_postgrest_client().aclose()
+        get_async_postgrest_client.cache_clear()
+
 def get_supabase_storage():
     """Get the Supabase storage client for file operations"""
     supabase = get_supabase_client()
@@ -1,8 +1,13 @@
 import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.routes import auth, users, patients, appointments, prescriptions
+from app.routes import auth, users, patients, appointments, prescriptions, ai
+from app.AItool.knowledge_base import knowledge_base
 from app.core.config import settings
+from app.core.security import password_hash_executor
+from app.db.loader import RequestScopeMiddleware
+from app.db.pagination import PAGINATION_HEADERS
+from app.db.supabase import close_async_postgrest_client
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -20,14 +25,44 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=PAGINATION_HEADERS,
 )
 
+# Per-request identity map / batching for row lookups
+app.add_middleware(RequestScopeMiddleware)
+
 # Include routers
 app.include_router(auth.router, prefix="/api", tags=["Authentication"])
 app.include_router(users.router, prefix="/api", tags=["Users"])
 app.include_router(patients.router, prefix="/api", tags=["Patients"])
 app.include_router(appointments.router, prefix="/api", tags=["Appointments"])
 app.include_router(prescriptions.router, prefix="/api", tags=["Prescriptions"])
+app.include_router(ai.router, prefix="/api", tags=["AI Tools"])
+
+@app.on_event("startup")
+async def startup_event():
+    # Build the AI knowledge bases before the first request needs them
+    await knowledge_base.start()
+    # Load the patient typeahead index in the background
+    patients.patient_index.start()
+    # Load booked appointment spans for conflict checks and free-slot search
+    appointments.availability.start()
+    if settings.REMINDERS_ENABLED:
+        appointments.reminders.start()
+    appointments.auto_complete_task.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # End open appointment streams so the server can stop
+    appointments.appointment_events.close()
+    await knowledge_base.stop()
+    await patients.patient_index.stop()
+    await appointments.availability.stop()
+    await appointments.reminders.stop()
+    await appointments.auto_complete_task.stop()
+    await close_async_postgrest_client()
+    password_hash_executor.shutdown()
+    ai.ai_executor.shutdown()
 
 @app.get("/api/health")
 async def health_check():
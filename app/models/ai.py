@@ -0,0 +1,48 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+class SymptomAnalysisRequest(BaseModel):
+    symptoms: List[str] = Field(..., min_items=1)
+    top_k: int = Field(3, ge=1, le=20)
+
+class PossibleDiagnosis(BaseModel):
+    condition: str
+    confidence: float
+    severity: int
+    description: str
+    matched_symptoms: int
+
+class SymptomAnalysisResponse(BaseModel):
+    possible_diagnoses: List[PossibleDiagnosis]
+    recommendation: str
+    disclaimer: str
+
+class TestSuggestionRequest(BaseModel):
+    symptoms: List[str] = Field(..., min_items=1)
+    patient_age: int = Field(..., ge=0)
+    patient_gender: str
+
+class MedicationItem(BaseModel):
+    name: str
+    dosage: Optional[str] = None
+
+class InteractionCheckRequest(BaseModel):
+    medications: List[MedicationItem] = Field(..., min_items=1)
+
+class InteractionBatchRequest(BaseModel):
+    medication_lists: List[List[MedicationItem]] = Field(..., min_items=1)
+
+class Interaction(BaseModel):
+    medications: List[str]
+    severity: str
+    warning: str
+    recommendation: Optional[str] = None
+
+class InteractionReport(BaseModel):
+    interactions: List[Interaction]
+    recommendation: str
+    disclaimer: str
+
+class MedicationAlternative(BaseModel):
+    name: str
+    reason: str
@@ -1,12 +1,21 @@
 from sqlmodel import Field, SQLModel
-from typing import Optional
+from typing import Dict, FrozenSet, List, Optional
 from datetime import datetime
+from app.core.config import settings
 import uuid
 
+# Allowed status changes: scheduled appointments end up completed or cancelled
+STATUS_TRANSITIONS: Dict[str, FrozenSet[str]] = {
+    "scheduled": frozenset({"completed", "cancelled"}),
+    "completed": frozenset(),
+    "cancelled": frozenset(),
+}
+
 class AppointmentBase(SQLModel):
     patient_id: str = Field(foreign_key="patients.id")
     doctor_id: str = Field(foreign_key="users.id")
     appointment_date: datetime
+    duration_minutes: int = Field(default_factory=lambda: settings.APPOINTMENT_DEFAULT_DURATION_MINUTES, gt=0)
     reason: str
     status: str = "scheduled"  # scheduled, completed, cancelled
     notes: Optional[str] = None
@@ -23,6 +32,7 @@ class AppointmentCreate(AppointmentBase):
 
 class AppointmentUpdate(SQLModel):
     appointment_date: Optional[datetime] = None
+    duration_minutes: Optional[int] = Field(default=None, gt=0)
     reason: Optional[str] = None
     status: Optional[str] = None
     notes: Optional[str] = None
@@ -30,4 +40,23 @@ class AppointmentUpdate(SQLModel):
 class AppointmentResponse(AppointmentBase):
     id: str
     created_at: datetime
-    updated_at: datetime
\ No newline at end of file
+    updated_at: datetime
+
+class AvailabilitySlot(SQLModel):
+    start: datetime
+    end: datetime
+
+class AppointmentStatusTransition(SQLModel):
+    status: str
+    ids: Optional[List[str]] = None
+    doctor_id: Optional[str] = None
+    patient_id: Optional[str] = None
+    from_date: Optional[datetime] = None
+    to_date: Optional[datetime] = None
+
+class AppointmentTransitionResult(SQLModel):
+    status: str
+    updated: int
+    updated_ids: List[str]
+    # More appointments in the date range remain to transition
+    has_more: bool = False
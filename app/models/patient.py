@@ -42,4 +42,8 @@ class PatientResponse(PatientBase):
     id: str
     created_at: datetime
     updated_at: datetime
-    created_by: str
\ No newline at end of file
+    created_by: str
+
+class PatientSuggestion(SQLModel):
+    id: str
+    display_name: str
@@ -44,13 +44,21 @@ class Medication(SQLModel, table=True):
 class PrescriptionCreate(PrescriptionBase):
     pass
 
+class MedicationUpdate(MedicationBase):
+    # Id of an existing medication to update in place; omit to add a new one
+    id: Optional[str] = None
+
+class MedicationResponse(MedicationBase):
+    id: str
+
 class PrescriptionUpdate(SQLModel):
     diagnosis: Optional[str] = None
     notes: Optional[str] = None
     file_url: Optional[str] = None
-    medications: Optional[List[MedicationBase]] = None
+    medications: Optional[List[MedicationUpdate]] = None
 
 class PrescriptionWithMedications(PrescriptionBase):
     id: str
     created_at: datetime
-    updated_at: datetime
\ No newline at end of file
+    updated_at: datetime
+    medications: List[MedicationResponse]
\ No newline at end of file
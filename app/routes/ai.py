@@ -0,0 +1,147 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Any, Callable, List
+from functools import lru_cache
+from app.AItool.diagnosis_assistant import DiagnosisAssistant
+from app.AItool.knowledge_base import knowledge_base
+from app.AItool.medication_advisor import MedicationAdvisor
+from app.core.concurrency import BoundedExecutor, ExecutorBusyError
+from app.core.config import settings
+from app.core.dependencies import get_current_active_user
+from app.models.user import User
+from app.models.ai import (
+    SymptomAnalysisRequest, SymptomAnalysisResponse, TestSuggestionRequest,
+    InteractionCheckRequest, InteractionBatchRequest, InteractionReport, MedicationAlternative
+)
+from app.utils.exceptions import ServiceUnavailableException
+import asyncio
+
+router = APIRouter()
+
+# CPU-bound scoring runs here so it never blocks the event loop
+ai_executor = BoundedExecutor(
+    name="ai-tools",
+    max_workers=settings.AI_EXECUTOR_WORKERS,
+    max_pending=settings.AI_EXECUTOR_MAX_PENDING,
+    queue_timeout=settings.AI_EXECUTOR_QUEUE_TIMEOUT,
+)
+
+@lru_cache()
+def get_diagnosis_assistant() -> DiagnosisAssistant:
+    """Shared diagnosis assistant, created once per worker"""
+    return DiagnosisAssistant(knowledge_base)
+
+@lru_cache()
+def get_medication_advisor() -> MedicationAdvisor:
+    """Shared medication advisor, created once per worker"""
+    return MedicationAdvisor(knowledge_base)
+
+async def run_ai_task(func: Callable[..., Any], *args: Any) -> Any:
+    """Run a CPU-bound AI call on the bounded executor with the request timeout"""
+    try:
+        return await ai_executor.run(func, *args, timeout=settings.AI_REQUEST_TIMEOUT)
+    except ExecutorBusyError:
+        raise ServiceUnavailableException("AI tools are busy, please retry")
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail="AI analysis timed out"
+        )
+
+@router.post("/ai/symptoms/analyze", response_model=SymptomAnalysisResponse)
+async def analyze_symptoms(
+    request: SymptomAnalysisRequest,
+    assistant: DiagnosisAssistant = Depends(get_diagnosis_assistant),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Suggest possible diagnoses for a set of symptoms
+    """
+    try:
+        return await run_ai_task(assistant.analyze, request.symptoms, request.top_k)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error analyzing symptoms: {str(e)}"
+        )
+
+@router.post("/ai/tests/suggest", response_model=List[str])
+async def suggest_tests(
+    request: TestSuggestionRequest,
+    assistant: DiagnosisAssistant = Depends(get_diagnosis_assistant),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Suggest medical tests based on symptoms and patient information
+    """
+    try:
+        return await assistant.suggest_tests(request.symptoms, request.patient_age, request.patient_gender)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error suggesting tests: {str(e)}"
+        )
+
+@router.post("/ai/interactions/check", response_model=InteractionReport)
+async def check_interactions(
+    request: InteractionCheckRequest,
+    advisor: MedicationAdvisor = Depends(get_medication_advisor),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Check a medication list for known drug interactions
+    """
+    try:
+        return await run_ai_task(advisor.screen, [med.name for med in request.medications])
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error checking interactions: {str(e)}"
+        )
+
+@router.post("/ai/interactions/check/batch", response_model=List[InteractionReport])
+async def check_interactions_batch(
+    request: InteractionBatchRequest,
+    advisor: MedicationAdvisor = Depends(get_medication_advisor),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Check many medication lists for known drug interactions in one call
+    """
+    if len(request.medication_lists) > settings.AI_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.AI_BATCH_MAX_SIZE} medication lists can be checked per request"
+        )
+
+    try:
+        med_name_lists = [[med.name for med in medications] for medications in request.medication_lists]
+        return await run_ai_task(advisor.screen_batch, med_name_lists)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error checking interactions: {str(e)}"
+        )
+
+@router.get("/ai/alternatives", response_model=List[MedicationAlternative])
+async def suggest_alternatives(
+    medication: str,
+    reason: str = "",
+    advisor: MedicationAdvisor = Depends(get_medication_advisor),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Suggest alternative medications
+    """
+    try:
+        return await advisor.suggest_alternatives(medication, reason)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error suggesting alternatives: {str(e)}"
+        )
@@ -1,14 +1,167 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
+from app.core.cache import APPOINTMENT_ENTITY_CACHE
+from app.core.config import settings
 from app.core.dependencies import get_current_active_user
-from app.db.orm import CRUDBase
+from app.core.events import EventBroker
+from app.core.tasks import PeriodicTask
+from app.db.orm import ConstraintViolation, CRUDBase, Filter
+from app.db.pagination import MAX_PAGE_SIZE, set_pagination_headers
 from app.models.user import User
-from app.models.appointment import Appointment, AppointmentCreate, AppointmentUpdate, AppointmentResponse
-from app.db.supabase import get_supabase_client
+from app.models.appointment import (
+    STATUS_TRANSITIONS, Appointment, AppointmentCreate, AppointmentUpdate, AppointmentResponse,
+    AppointmentStatusTransition, AppointmentTransitionResult, AvailabilitySlot
+)
+from app.utils.availability import FREE_STATUSES, AvailabilityIndex, WorkingHours, parse_time, to_utc_naive
+from app.utils.exceptions import ConflictException, ServiceUnavailableException
+from app.utils.reminders import LoggingReminderSender, ReminderScheduler
+import asyncio
+import uuid
 
 router = APIRouter()
-appointment_crud = CRUDBase(Appointment)
+appointment_crud = CRUDBase(Appointment, order_by=("appointment_date", "id"), cache=APPOINTMENT_ENTITY_CACHE)
+
+# Booked spans per doctor, started and stopped with the application
+availability = AvailabilityIndex(
+    appointment_crud,
+    working_hours=WorkingHours(
+        start=parse_time(settings.WORKING_HOURS_START),
+        end=parse_time(settings.WORKING_HOURS_END),
+        days=settings.WORKING_DAYS,
+        tz=settings.CLINIC_TIMEZONE,
+    ),
+    default_duration=timedelta(minutes=settings.APPOINTMENT_DEFAULT_DURATION_MINUTES),
+    slot_step=timedelta(minutes=settings.APPOINTMENT_SLOT_STEP_MINUTES),
+    refresh_interval=settings.AVAILABILITY_REFRESH_INTERVAL,
+)
+
+# Reminders fired before scheduled appointments; swap the sender for a real
+# SMS / e-mail integration
+reminders = ReminderScheduler(
+    appointment_crud,
+    LoggingReminderSender(),
+    offsets=[timedelta(minutes=minutes) for minutes in settings.REMINDER_OFFSETS_MINUTES],
+    lease_length=timedelta(minutes=settings.REMINDER_LEASE_MINUTES),
+)
+
+# Appointment change events for the dashboards' live stream
+appointment_events = EventBroker(
+    buffer_size=settings.EVENT_STREAM_BUFFER_SIZE,
+    max_queue=settings.EVENT_STREAM_QUEUE_SIZE,
+)
+
+CLINIC_TOPIC = "clinic"
+
+def doctor_topic(doctor_id: str) -> str:
+    return f"doctor:{doctor_id}"
+
+def publish_appointment_event(event_type: str, appointment: dict) -> None:
+    """Notify the clinic stream and the appointment's doctor stream"""
+    appointment_events.publish(
+        event_type,
+        jsonable_encoder(appointment),
+        (CLINIC_TOPIC, doctor_topic(appointment["doctor_id"])),
+    )
+
+async def find_conflicts(doctor_id: str, start: datetime, end: datetime, exclude_id: Optional[str] = None) -> List[str]:
+    """Ids of the doctor's appointments overlapping [start, end)"""
+    if availability.ready:
+        return availability.conflicts(doctor_id, start, end, exclude_id)
+    # The index is still loading, ask the database. `during` is a computed field
+    # served by the overlap constraint's GiST index
+    page = await appointment_crud.fetch_page(
+        filters=[
+            ("doctor_id", "eq", doctor_id),
+            ("status", "neq", "cancelled"),
+            ("during", "ov", f"[{start.isoformat()}+00:00,{end.isoformat()}+00:00)"),
+        ],
+        columns="id,appointment_date",
+    )
+    return [row["id"] for row in page.items if row["id"] != exclude_id]
+
+async def ensure_doctor_available(appointment: dict, exclude_id: Optional[str] = None) -> None:
+    """Reject an appointment that would double-book its doctor"""
+    if appointment.get("status") in FREE_STATUSES:
+        return
+    start, end = availability.span_of(appointment)
+    if await find_conflicts(str(appointment["doctor_id"]), start, end, exclude_id):
+        raise ConflictException("The doctor already has an appointment at this time")
+
+async def transition_appointments(
+    target: str,
+    filters: List[Filter],
+    *,
+    limit: Optional[int] = None,
+) -> Tuple[List[dict], bool]:
+    """
+    Move appointments matching `filters` to the `target` status with one
+    UPDATE (per chunk of ids). Appointments whose current status doesn't allow
+    the transition are left alone.
+    With a `limit`, the ids of the first `limit` matching appointments are
+    selected first so the UPDATE stays bounded.
+    Returns the updated rows and whether more appointments remain to transition.
+    """
+    sources = [source for source, targets in STATUS_TRANSITIONS.items() if target in targets]
+    filters = [*filters, ("status", "in", sources)]
+    if target == "completed":
+        # Only appointments that have started can be completed
+        filters.append(("appointment_date", "lte", datetime.utcnow()))
+
+    has_more = False
+    if limit is not None:
+        page = await appointment_crud.fetch_page(filters=filters, limit=limit, columns="id,appointment_date")
+        if not page.items:
+            return [], False
+        has_more = page.next_cursor is not None
+        filters.append(("id", "in", [row["id"] for row in page.items]))
+
+    result = await appointment_crud.update_where(filters, {"status": target})
+    rows = result.rows
+
+    updated_by_doctor: Dict[str, List[str]] = {}
+    for row in rows:
+        availability.add(row)
+        reminders.schedule(row)
+        updated_by_doctor.setdefault(str(row["doctor_id"]), []).append(str(row["id"]))
+    # One event per stream rather than one per appointment
+    if rows:
+        appointment_events.publish(
+            "appointments.status_changed",
+            {"status": target, "ids": [str(row["id"]) for row in rows]},
+            (CLINIC_TOPIC,),
+        )
+        for doctor_id, ids in updated_by_doctor.items():
+            appointment_events.publish(
+                "appointments.status_changed",
+                {"status": target, "ids": ids},
+                (doctor_topic(doctor_id),),
+            )
+    # Chunks that failed are reported after the others have been applied
+    result.raise_for_errors()
+    return rows, has_more
+
+async def auto_complete_appointments() -> None:
+    """Mark scheduled appointments that started a while ago as completed"""
+    cutoff = datetime.utcnow() - timedelta(minutes=settings.APPOINTMENT_AUTO_COMPLETE_AFTER_MINUTES)
+    # Bounded batches, so a large backlog (e.g. after downtime) isn't one huge UPDATE
+    while True:
+        rows, has_more = await transition_appointments(
+            "completed",
+            [("appointment_date", "lt", cutoff)],
+            limit=settings.APPOINTMENT_AUTO_COMPLETE_BATCH_SIZE,
+        )
+        if not has_more or not rows:
+            break
+
+# Started and stopped with the application
+auto_complete_task = PeriodicTask(
+    "appointment-auto-complete",
+    settings.APPOINTMENT_AUTO_COMPLETE_INTERVAL,
+    auto_complete_appointments,
+)
 
 @router.post("/appointments", response_model=AppointmentResponse, status_code=status.HTTP_201_CREATED)
 async def create_appointment(
@@ -19,18 +172,34 @@ async def create_appointment(
     Create a new appointment
     """
     try:
+        appointment_data = appointment_in.dict()
+        appointment_data["appointment_date"] = to_utc_naive(appointment_in.appointment_date)
+
         # Validate appointment date is in the future
-        if appointment_in.appointment_date < datetime.utcnow():
+        if appointment_data["appointment_date"] < datetime.utcnow():
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Appointment date must be in the future"
             )
-            
-        # Create appointment
-        new_appointment = await appointment_crud.create(obj_in=appointment_in.dict())
+
+        await ensure_doctor_available(appointment_data)
+
+        # Hold the slot while the insert is in flight so concurrent bookings see it
+        appointment_data["id"] = str(uuid.uuid4())
+        availability.add(appointment_data)
+        try:
+            new_appointment = await appointment_crud.create(obj_in=appointment_data)
+        except Exception:
+            availability.remove(appointment_data["id"])
+            raise
+        reminders.schedule(new_appointment.dict())
+        publish_appointment_event("appointment.created", new_appointment.dict())
         return new_appointment
     except HTTPException:
         raise
+    except ConstraintViolation:
+        # Another worker booked the slot first
+        raise ConflictException("The doctor already has an appointment at this time")
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -39,44 +208,187 @@ async def create_appointment(
 
 @router.get("/appointments", response_model=List[AppointmentResponse])
 async def read_appointments(
-    skip: int = 0,
-    limit: int = 100,
+    request: Request,
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    include_total: bool = False,
     patient_id: Optional[str] = None,
     doctor_id: Optional[str] = None,
-    status: Optional[str] = None,
+    status_filter: Optional[str] = Query(None, alias="status"),
     from_date: Optional[datetime] = None,
     to_date: Optional[datetime] = None,
     current_user: User = Depends(get_current_active_user)
 ):
     """
-    Retrieve appointments with filtering options
+    Retrieve appointments with filtering options, ordered by appointment date.
+    Follow the `Link` / `X-Next-Cursor` response headers to page through results.
     """
     try:
-        supabase = get_supabase_client()
-        query = supabase.table("appointments").select("*")
-        
         # Apply filters
+        filters = []
         if patient_id:
-            query = query.eq("patient_id", patient_id)
+            filters.append(("patient_id", "eq", patient_id))
         if doctor_id:
-            query = query.eq("doctor_id", doctor_id)
-        if status:
-            query = query.eq("status", status)
+            filters.append(("doctor_id", "eq", doctor_id))
+        if status_filter:
+            filters.append(("status", "eq", status_filter))
         if from_date:
-            query = query.gte("appointment_date", from_date.isoformat())
+            filters.append(("appointment_date", "gte", from_date))
         if to_date:
-            query = query.lte("appointment_date", to_date.isoformat())
+            filters.append(("appointment_date", "lte", to_date))
             
-        # Apply pagination
-        response = query.range(skip, skip + limit - 1).execute()
-        
-        return [Appointment(**item) for item in response.data]
+        page = await appointment_crud.get_page(
+            filters=filters,
+            cursor=cursor,
+            limit=limit,
+            skip=skip,
+            include_total=include_total,
+        )
+        set_pagination_headers(response, request, page)
+        return page.items
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error retrieving appointments: {str(e)}"
         )
 
+@router.post("/appointments/transitions", response_model=AppointmentTransitionResult)
+async def transition_appointments_bulk(
+    transition: AppointmentStatusTransition,
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Change the status of many appointments at once, e.g. cancel a day on clinic closure.
+    Select appointments by `ids` or by a date range (optionally narrowed to a doctor
+    or patient); scheduled appointments can become completed or cancelled.
+    A date range transitions at most APPOINTMENT_BULK_MAX_SIZE appointments per
+    call; repeat the call while `has_more` is true.
+    """
+    targets = set().union(*STATUS_TRANSITIONS.values())
+    if transition.status not in targets:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Appointments can only be transitioned to: {', '.join(sorted(targets))}"
+        )
+    if not transition.ids and not (transition.from_date and transition.to_date):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Select appointments by ids or by from_date and to_date"
+        )
+    if transition.ids and len(transition.ids) > settings.APPOINTMENT_BULK_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.APPOINTMENT_BULK_MAX_SIZE} appointments can be transitioned per request"
+        )
+
+    try:
+        filters = []
+        if transition.ids:
+            filters.append(("id", "in", transition.ids))
+        if transition.doctor_id:
+            filters.append(("doctor_id", "eq", transition.doctor_id))
+        if transition.patient_id:
+            filters.append(("patient_id", "eq", transition.patient_id))
+        if transition.from_date:
+            filters.append(("appointment_date", "gte", to_utc_naive(transition.from_date)))
+        if transition.to_date:
+            filters.append(("appointment_date", "lte", to_utc_naive(transition.to_date)))
+
+        # Explicit ids are already capped; a date range is processed in bounded batches
+        limit = None if transition.ids else settings.APPOINTMENT_BULK_MAX_SIZE
+        rows, has_more = await transition_appointments(transition.status, filters, limit=limit)
+        return AppointmentTransitionResult(
+            status=transition.status,
+            updated=len(rows),
+            updated_ids=[str(row["id"]) for row in rows],
+            has_more=has_more,
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error updating appointment statuses: {str(e)}"
+        )
+
+@router.get("/appointments/availability", response_model=List[AvailabilitySlot])
+async def read_availability(
+    doctor_id: str,
+    from_date: Optional[datetime] = None,
+    to_date: Optional[datetime] = None,
+    duration_minutes: Optional[int] = Query(None, ge=5, le=480),
+    limit: int = Query(100, ge=1, le=500),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Free slots of a doctor within working hours (UTC).
+    Defaults to the next 7 days and the standard appointment duration.
+    """
+    try:
+        start = max(to_utc_naive(from_date), datetime.utcnow()) if from_date else datetime.utcnow()
+        end = to_utc_naive(to_date) if to_date else start + timedelta(days=7)
+        if end - start > timedelta(days=settings.AVAILABILITY_MAX_RANGE_DAYS):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Availability can be requested for at most {settings.AVAILABILITY_MAX_RANGE_DAYS} days"
+            )
+        if not availability.ready:
+            raise ServiceUnavailableException("Availability is still loading, please retry")
+
+        duration = timedelta(minutes=duration_minutes) if duration_minutes else None
+        return [
+            AvailabilitySlot(start=slot_start, end=slot_end)
+            for slot_start, slot_end in availability.free_slots(doctor_id, start, end, duration, limit)
+        ]
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error retrieving availability: {str(e)}"
+        )
+
+async def stream_events(subscription) -> AsyncIterator[str]:
+    """Relay a subscription as Server-Sent Events with periodic keep-alives"""
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            try:
+                chunk = await asyncio.wait_for(subscription.get(), timeout=settings.EVENT_STREAM_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if chunk is None:
+                break
+            yield chunk
+    finally:
+        appointment_events.unsubscribe(subscription)
+
+@router.get("/appointments/stream")
+async def stream_appointments(
+    doctor_id: Optional[str] = None,
+    last_event_id: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Live stream of appointment changes (Server-Sent Events) for one doctor, or
+    for the whole clinic when `doctor_id` is omitted.
+    Events are `appointment.created`, `appointment.updated` and
+    `appointment.deleted`; reconnect with `Last-Event-ID` to receive missed
+    events, or get a `reset` event when they are no longer available.
+    """
+    topic = doctor_topic(doctor_id) if doctor_id else CLINIC_TOPIC
+    subscription = appointment_events.subscribe((topic,), last_event_id)
+    return StreamingResponse(
+        stream_events(subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @router.get("/appointments/{appointment_id}", response_model=AppointmentResponse)
 async def read_appointment(
     appointment_id: str,
@@ -122,16 +434,35 @@ async def update_appointment(
         update_data = appointment_update.dict(exclude_unset=True)
         
         # Validate appointment date if being updated
-        if "appointment_date" in update_data and update_data["appointment_date"] < datetime.utcnow():
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Appointment date must be in the future"
-            )
-            
-        updated_appointment = await appointment_crud.update(id=appointment_id, obj_in=update_data)
+        if update_data.get("appointment_date"):
+            update_data["appointment_date"] = to_utc_naive(update_data["appointment_date"])
+            if update_data["appointment_date"] < datetime.utcnow():
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Appointment date must be in the future"
+                )
+
+        previous = existing_appointment.dict()
+        merged = {**previous, **update_data}
+        if {"appointment_date", "duration_minutes", "status"} & update_data.keys():
+            await ensure_doctor_available(merged, exclude_id=appointment_id)
+
+        # Hold the new slot while the update is in flight
+        availability.add(merged)
+        try:
+            updated_appointment = await appointment_crud.update(id=appointment_id, obj_in=update_data)
+        except Exception:
+            availability.add(previous)
+            raise
+        if updated_appointment:
+            availability.add(updated_appointment.dict())
+            reminders.schedule(updated_appointment.dict())
+            publish_appointment_event("appointment.updated", updated_appointment.dict())
         return updated_appointment
     except HTTPException:
         raise
+    except ConstraintViolation:
+        raise ConflictException("The doctor already has an appointment at this time")
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -161,6 +492,12 @@ async def delete_appointment(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Failed to delete appointment"
             )
+        availability.remove(appointment_id)
+        reminders.unschedule(appointment_id)
+        publish_appointment_event(
+            "appointment.deleted",
+            {"id": appointment_id, "doctor_id": existing_appointment.doctor_id},
+        )
         return None
     except HTTPException:
         raise
@@ -3,15 +3,16 @@ from fastapi.security import OAuth2PasswordRequestForm
 from typing import Optional
 from datetime import timedelta
 from app.core.config import settings
-from app.core.security import create_access_token, create_refresh_token, verify_password, get_password_hash
+from app.core.cache import USER_ENTITY_CACHE, user_cache
+from app.core.security import create_access_token, create_refresh_token, verify_and_update_password, hash_password
 from app.db.orm import CRUDBase
 from app.models.user import User, UserCreate, UserResponse
 from app.models.auth import Token, LoginRequest
-from app.db.supabase import get_supabase_client
+from app.db.supabase import get_async_postgrest_client
 from jose import jwt, JWTError
 
 router = APIRouter()
-user_crud = CRUDBase(User)
+user_crud = CRUDBase(User, cache=USER_ENTITY_CACHE)
 
 @router.post("/auth/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 async def register(user_in: UserCreate):
@@ -20,8 +21,8 @@ async def register(user_in: UserCreate):
     """
     try:
         # Check if user already exists
-        supabase = get_supabase_client()
-        response = supabase.table("users").select("*").eq("email", user_in.email).execute()
+        db = get_async_postgrest_client()
+        response = await db.from_("users").select("*").eq("email", user_in.email).execute()
         
         if response.data and len(response.data) > 0:
             raise HTTPException(
@@ -31,7 +32,7 @@ async def register(user_in: UserCreate):
         
         # Create new user
         user_data = user_in.dict(exclude={"password", "password_confirm"})
-        user_data["hashed_password"] = get_password_hash(user_in.password)
+        user_data["hashed_password"] = await hash_password(user_in.password)
         
         new_user = await user_crud.create(obj_in=user_data)
         return new_user
@@ -49,8 +50,8 @@ async def login(response: Response, login_data: LoginRequest):
     OAuth2 compatible token login, get an access token for future requests
     """
     try:
-        supabase = get_supabase_client()
-        db_response = supabase.table("users").select("*").eq("email", login_data.email).execute()
+        db = get_async_postgrest_client()
+        db_response = await db.from_("users").select("*").eq("email", login_data.email).execute()
         
         if not db_response.data or len(db_response.data) == 0:
             raise HTTPException(
@@ -61,13 +62,23 @@ async def login(response: Response, login_data: LoginRequest):
         
         user = User(**db_response.data[0])
         
-        if not verify_password(login_data.password, user.hashed_password):
+        valid, new_hash = await verify_and_update_password(login_data.password, user.hashed_password)
+        if not valid:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Incorrect email or password",
                 headers={"WWW-Authenticate": "Bearer"},
             )
             
+        # Transparently upgrade hashes made with outdated parameters
+        if new_hash:
+            try:
+                await user_crud.update(id=user.id, obj_in={"hashed_password": new_hash})
+                user_cache.invalidate(user.id)
+            except Exception:
+                # The old hash is still valid, retry on the next login
+                pass
+            
         if not user.is_active:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
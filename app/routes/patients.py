@@ -1,13 +1,35 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, Response, UploadFile, status
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
+from app.core.cache import PATIENT_ENTITY_CACHE
+from app.core.config import settings
 from app.core.dependencies import get_current_active_user
 from app.db.orm import CRUDBase
+from app.db.pagination import MAX_PAGE_SIZE, set_pagination_headers
+from app.db.supabase import get_async_postgrest_client
 from app.models.user import User
-from app.models.patient import Patient, PatientCreate, PatientUpdate, PatientResponse
-from app.db.supabase import get_supabase_client
+from app.models.patient import Patient, PatientCreate, PatientUpdate, PatientResponse, PatientSuggestion
+from app.utils.patient_import import detect_format, import_patients
+from app.utils.patient_index import PatientPrefixIndex
 
 router = APIRouter()
-patient_crud = CRUDBase(Patient)
+patient_crud = CRUDBase(Patient, cache=PATIENT_ENTITY_CACHE)
+
+# Typeahead index, started and stopped with the application
+patient_index = PatientPrefixIndex(
+    patient_crud,
+    refresh_interval=settings.PATIENT_INDEX_REFRESH_INTERVAL,
+    page_size=settings.PATIENT_INDEX_PAGE_SIZE,
+)
+
+async def search_patients(search: str, *, limit: int = 20, skip: int = 0) -> List[Patient]:
+    """Ranked patient search by name, phone or email (best matches first)"""
+    db = get_async_postgrest_client()
+    response = await db.rpc(
+        "search_patients",
+        {"query": search, "result_limit": min(limit, MAX_PAGE_SIZE), "result_offset": max(skip, 0)},
+    ).execute()
+    return [Patient(**item) for item in response.data or []]
 
 @router.post("/patients", response_model=PatientResponse, status_code=status.HTTP_201_CREATED)
 async def create_patient(
@@ -22,6 +44,7 @@ async def create_patient(
         patient_data["created_by"] = current_user.id
         
         new_patient = await patient_crud.create(obj_in=patient_data)
+        patient_index.add(new_patient.dict())
         return new_patient
     except Exception as e:
         raise HTTPException(
@@ -29,32 +52,98 @@ async def create_patient(
             detail=f"Error creating patient: {str(e)}"
         )
 
+@router.post("/patients/import")
+async def import_patients_file(
+    file: UploadFile = File(...),
+    format: Optional[str] = None,
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Bulk import patients from a CSV (with a header row) or NDJSON file.
+    The response is an NDJSON stream of per-row "error" events, a "progress"
+    event per inserted batch and a final "summary"; valid rows are inserted
+    even when others fail.
+    """
+    fmt = detect_format(file, format)
+    return StreamingResponse(
+        import_patients(
+            file,
+            fmt,
+            crud=patient_crud,
+            created_by=current_user.id,
+            batch_size=settings.PATIENT_IMPORT_BATCH_SIZE,
+            on_inserted=patient_index.add_many,
+        ),
+        media_type="application/x-ndjson",
+    )
+
 @router.get("/patients", response_model=List[PatientResponse])
 async def read_patients(
-    skip: int = 0,
-    limit: int = 100,
+    request: Request,
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    include_total: bool = False,
     search: Optional[str] = None,
     current_user: User = Depends(get_current_active_user)
 ):
     """
-    Retrieve patients with optional search
+    Retrieve patients with optional search.
+    Without `search`, follow the `Link` / `X-Next-Cursor` response headers to page
+    through results. With `search`, results are ranked by relevance and paged with
+    `skip`/`limit` (at most 100 per page).
     """
     try:
-        supabase = get_supabase_client()
-        query = supabase.table("patients").select("*")
-        
         if search:
-            query = query.or_(f"first_name.ilike.%{search}%,last_name.ilike.%{search}%")
+            return await search_patients(search, limit=limit, skip=skip)
             
-        response = query.range(skip, skip + limit - 1).execute()
-        
-        return [Patient(**item) for item in response.data]
+        page = await patient_crud.get_page(
+            cursor=cursor,
+            limit=limit,
+            skip=skip,
+            include_total=include_total,
+        )
+        set_pagination_headers(response, request, page)
+        return page.items
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error retrieving patients: {str(e)}"
         )
 
+@router.get("/patients/suggest", response_model=List[PatientSuggestion])
+async def suggest_patients(
+    q: str,
+    limit: int = Query(10, ge=1, le=50),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    As-you-type patient lookup by name or phone number.
+    Served from the in-memory prefix index; falls back to the database search
+    while the index is still loading.
+    """
+    try:
+        if not patient_index.ready:
+            patients = await search_patients(q, limit=limit)
+            return [
+                PatientSuggestion(id=patient.id, display_name=f"{patient.first_name} {patient.last_name}")
+                for patient in patients
+            ]
+        return [
+            PatientSuggestion(id=patient_id, display_name=name)
+            for patient_id, name in patient_index.suggest(q, limit)
+        ]
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error suggesting patients: {str(e)}"
+        )
+
 @router.get("/patients/{patient_id}", response_model=PatientResponse)
 async def read_patient(
     patient_id: str,
@@ -100,6 +189,8 @@ async def update_patient(
             )
             
         updated_patient = await patient_crud.update(id=patient_id, obj_in=update_data)
+        if updated_patient:
+            patient_index.add(updated_patient.dict())
         return updated_patient
     except HTTPException:
         raise
@@ -132,6 +223,7 @@ async def delete_patient(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Failed to delete patient"
             )
+        patient_index.remove(patient_id)
         return None
     except HTTPException:
         raise
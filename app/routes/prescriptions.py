@@ -1,16 +1,157 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status, UploadFile, File
+from typing import Any, Dict, List, Optional, Tuple
+from fastapi.encoders import jsonable_encoder
+from app.core.config import settings
 from app.core.dependencies import get_current_active_user
 from app.db.orm import CRUDBase
+from app.db.pagination import MAX_PAGE_SIZE, Page, set_pagination_headers
 from app.models.user import User
-from app.models.prescription import Prescription, PrescriptionCreate, PrescriptionUpdate, PrescriptionWithMedications, Medication
+from app.models.prescription import Prescription, PrescriptionCreate, PrescriptionUpdate, PrescriptionWithMedications, Medication, MedicationUpdate
 from app.utils.file_upload import upload_prescription
-from app.db.supabase import get_supabase_client
+from app.db.supabase import get_async_postgrest_client
 import uuid
 
 router = APIRouter()
 prescription_crud = CRUDBase(Prescription)
-medication_crud = CRUDBase(Medication)
+medication_crud = CRUDBase(Medication, order_by=("id",))
+
+# Embeds each prescription's medications so PostgREST resolves them in the same round-trip
+PRESCRIPTION_WITH_MEDICATIONS = "*, medications(*)"
+
+def _prescription_result(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the API result from a prescription row with embedded medications"""
+    medications = row.pop("medications", None) or []
+    result = Prescription(**row).dict()
+    result["medications"] = medications
+    return result
+
+async def load_prescriptions(
+    *,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    include_total: bool = False,
+    patient_id: Optional[str] = None,
+    doctor_id: Optional[str] = None,
+) -> Page[Dict[str, Any]]:
+    """Load a page of prescriptions together with their medications"""
+    # Apply filters
+    filters = []
+    if patient_id:
+        filters.append(("patient_id", "eq", patient_id))
+    if doctor_id:
+        filters.append(("doctor_id", "eq", doctor_id))
+        
+    page = await prescription_crud.fetch_page(
+        filters=filters,
+        cursor=cursor,
+        limit=limit,
+        skip=skip,
+        columns=PRESCRIPTION_WITH_MEDICATIONS,
+    )
+    page.items = [_prescription_result(row) for row in page.items]
+    if include_total:
+        page.total = await prescription_crud.estimate_total(filters=filters)
+    return page
+
+MEDICATION_FIELDS = ("name", "dosage", "frequency", "duration", "instructions")
+
+def diff_medications(
+    prescription_id: str,
+    existing: List[Dict[str, Any]],
+    incoming: List[MedicationUpdate],
+) -> Tuple[List[Dict[str, Any]], List[str], List[Dict[str, Any]]]:
+    """
+    Compute the writes needed to turn `existing` medication rows into `incoming`.
+    Incoming medications are matched to existing rows by id, then by identical
+    content, then by name; matched rows keep their id.
+    Returns (rows to upsert, ids to delete, resulting rows in incoming order).
+    """
+    unmatched = {row["id"]: row for row in existing}
+    matches: List[Optional[Dict[str, Any]]] = [None] * len(incoming)
+    
+    def fields(med) -> Tuple:
+        return tuple(med.get(f) if isinstance(med, dict) else getattr(med, f) for f in MEDICATION_FIELDS)
+        
+    # Explicit ids first, then identical content, then same medication name
+    for i, med in enumerate(incoming):
+        if med.id and med.id in unmatched:
+            matches[i] = unmatched.pop(med.id)
+    for same in (
+        lambda row, med: fields(row) == fields(med),
+        lambda row, med: row["name"].lower() == med.name.lower(),
+    ):
+        for i, med in enumerate(incoming):
+            if matches[i] is None and not med.id:
+                row = next((r for r in unmatched.values() if same(r, med)), None)
+                if row is not None:
+                    matches[i] = unmatched.pop(row["id"])
+                    
+    upserts = []
+    result = []
+    for med, row in zip(incoming, matches):
+        if row is not None and fields(row) == fields(med):
+            result.append(row)
+            continue
+        new_row = {f: getattr(med, f) for f in MEDICATION_FIELDS}
+        new_row["id"] = row["id"] if row is not None else str(uuid.uuid4())
+        new_row["prescription_id"] = prescription_id
+        upserts.append(new_row)
+        result.append(new_row)
+        
+    return upserts, list(unmatched), result
+
+async def load_prescription(prescription_id: str) -> Optional[Dict[str, Any]]:
+    """Load a single prescription together with its medications"""
+    db = get_async_postgrest_client()
+    response = await db.from_("prescriptions").select(PRESCRIPTION_WITH_MEDICATIONS).eq("id", prescription_id).execute()
+    if not response.data:
+        return None
+    return _prescription_result(response.data[0])
+
+async def create_prescriptions(
+    prescriptions_in: List[PrescriptionCreate],
+    default_doctor_id: str,
+) -> List[Dict[str, Any]]:
+    """
+    Create prescriptions and their medications atomically in one round-trip
+    through the `create_prescriptions` database function.
+    """
+    payload = []
+    for prescription_in in prescriptions_in:
+        prescription_data = jsonable_encoder(prescription_in)
+        
+        # Ensure doctor_id is set to current user if not specified
+        if not prescription_data.get("doctor_id"):
+            prescription_data["doctor_id"] = default_doctor_id
+        payload.append(prescription_data)
+        
+    db = get_async_postgrest_client()
+    response = await db.rpc("create_prescriptions", {"payload": payload}).execute()
+    # Listings embed medications, so reads started before this write are stale
+    prescription_crud.reads.forget()
+    return [_prescription_result(row) for row in response.data or []]
+
+async def apply_prescription_update(
+    prescription_id: str,
+    changes: Dict[str, Any],
+    upserts: List[Dict[str, Any]],
+    delete_ids: List[str],
+) -> Optional[Dict[str, Any]]:
+    """
+    Update a prescription and write its medication changes atomically in one
+    round-trip through the `update_prescription` database function.
+    Returns the raw prescription row with its medications, or None if it doesn't exist.
+    """
+    db = get_async_postgrest_client()
+    response = await db.rpc("update_prescription", {
+        "target_id": prescription_id,
+        "changes": jsonable_encoder(changes),
+        "medication_upserts": jsonable_encoder(upserts),
+        "medication_deletes": delete_ids,
+    }).execute()
+    prescription_crud.reads.forget()
+    return response.data or None
 
 @router.post("/prescriptions", response_model=PrescriptionWithMedications, status_code=status.HTTP_201_CREATED)
 async def create_prescription(
@@ -21,37 +162,39 @@ async def create_prescription(
     Create a new prescription with medications
     """
     try:
-        supabase = get_supabase_client()
-        
-        # Create prescription
-        prescription_data = prescription_in.dict(exclude={"medications"})
-        
-        # Ensure doctor_id is set to current user if not specified
-        if "doctor_id" not in prescription_data or not prescription_data["doctor_id"]:
-            prescription_data["doctor_id"] = current_user.id
-            
-        new_prescription = await prescription_crud.create(obj_in=prescription_data)
-        
-        # Create medications
-        medications = []
-        for med in prescription_in.medications:
-            med_data = med.dict()
-            med_data["prescription_id"] = new_prescription.id
-            
-            response = supabase.table("medications").insert(med_data).execute()
-            medications.append(response.data[0])
-            
-        # Return combined result
-        result = new_prescription.dict()
-        result["medications"] = medications
-        
-        return result
+        created = await create_prescriptions([prescription_in], default_doctor_id=current_user.id)
+        return created[0]
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error creating prescription: {str(e)}"
         )
 
+@router.post("/prescriptions/bulk", response_model=List[PrescriptionWithMedications], status_code=status.HTTP_201_CREATED)
+async def create_prescriptions_bulk(
+    prescriptions_in: List[PrescriptionCreate],
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Create many prescriptions with medications in one request (e.g. bulk renewals).
+    Either all prescriptions are created or none are.
+    """
+    if len(prescriptions_in) > settings.PRESCRIPTION_BULK_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.PRESCRIPTION_BULK_MAX_SIZE} prescriptions can be created per request"
+        )
+    if not prescriptions_in:
+        return []
+        
+    try:
+        return await create_prescriptions(prescriptions_in, default_doctor_id=current_user.id)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error creating prescriptions: {str(e)}"
+        )
+
 @router.post("/prescriptions/{prescription_id}/upload", response_model=PrescriptionWithMedications)
 async def upload_prescription_file(
     prescription_id: str,
@@ -62,8 +205,8 @@ async def upload_prescription_file(
     Upload a prescription file (PDF, image, etc.)
     """
     try:
-        # Check if prescription exists
-        prescription = await prescription_crud.get(id=prescription_id)
+        # Check if prescription exists (medications are loaded alongside it)
+        prescription = await load_prescription(prescription_id)
         if not prescription:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -81,13 +224,9 @@ async def upload_prescription_file(
         update_data = {"file_url": file_url}
         updated_prescription = await prescription_crud.update(id=prescription_id, obj_in=update_data)
         
-        # Get medications for this prescription
-        supabase = get_supabase_client()
-        medications_response = supabase.table("medications").select("*").eq("prescription_id", prescription_id).execute()
-        
         # Return combined result
         result = updated_prescription.dict()
-        result["medications"] = medications_response.data
+        result["medications"] = prescription["medications"]
         
         return result
     except HTTPException:
@@ -100,41 +239,33 @@ async def upload_prescription_file(
 
 @router.get("/prescriptions", response_model=List[PrescriptionWithMedications])
 async def read_prescriptions(
-    skip: int = 0,
-    limit: int = 100,
+    request: Request,
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    include_total: bool = False,
     patient_id: Optional[str] = None,
     doctor_id: Optional[str] = None,
     current_user: User = Depends(get_current_active_user)
 ):
     """
-    Retrieve prescriptions with filtering options
+    Retrieve prescriptions with filtering options.
+    Follow the `Link` / `X-Next-Cursor` response headers to page through results.
     """
     try:
-        supabase = get_supabase_client()
-        query = supabase.table("prescriptions").select("*")
-        
-        # Apply filters
-        if patient_id:
-            query = query.eq("patient_id", patient_id)
-        if doctor_id:
-            query = query.eq("doctor_id", doctor_id)
-            
-        # Apply pagination
-        prescriptions_response = query.range(skip, skip + limit - 1).execute()
-        
-        # Get medications for each prescription
-        result = []
-        for prescription_data in prescriptions_response.data:
-            prescription = Prescription(**prescription_data)
-            
-            medications_response = supabase.table("medications").select("*").eq("prescription_id", prescription.id).execute()
-            
-            prescription_dict = prescription.dict()
-            prescription_dict["medications"] = medications_response.data
-            
-            result.append(prescription_dict)
-            
-        return result
+        page = await load_prescriptions(
+            skip=skip,
+            limit=limit,
+            cursor=cursor,
+            include_total=include_total,
+            patient_id=patient_id,
+            doctor_id=doctor_id,
+        )
+        set_pagination_headers(response, request, page)
+        return page.items
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -150,22 +281,13 @@ async def read_prescription(
     Get a specific prescription by id with its medications
     """
     try:
-        prescription = await prescription_crud.get(id=prescription_id)
+        prescription = await load_prescription(prescription_id)
         if not prescription:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Prescription not found"
             )
-            
-        # Get medications for this prescription
-        supabase = get_supabase_client()
-        medications_response = supabase.table("medications").select("*").eq("prescription_id", prescription_id).execute()
-        
-        # Return combined result
-        result = prescription.dict()
-        result["medications"] = medications_response.data
-        
-        return result
+        return prescription
     except HTTPException:
         raise
     except Exception as e:
@@ -184,40 +306,38 @@ async def update_prescription(
     Update a prescription and its medications
     """
     try:
-        # Check if prescription exists
-        existing_prescription = await prescription_crud.get(id=prescription_id)
+        # Check if prescription exists (medications are loaded alongside it)
+        existing_prescription = await load_prescription(prescription_id)
         if not existing_prescription:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Prescription not found"
             )
             
-        supabase = get_supabase_client()
-        
-        # Update prescription
         prescription_data = prescription_update.dict(exclude={"medications"}, exclude_unset=True)
-        if prescription_data:
-            updated_prescription = await prescription_crud.update(id=prescription_id, obj_in=prescription_data)
-        else:
-            updated_prescription = existing_prescription
             
-        # Update medications if provided
+        # Only write the medications that actually changed
+        medications = existing_prescription["medications"]
+        upserts: List[Dict[str, Any]] = []
+        delete_ids: List[str] = []
         if prescription_update.medications is not None:
-            # Delete existing medications
-            supabase.table("medications").delete().eq("prescription_id", prescription_id).execute()
+            upserts, delete_ids, medications = diff_medications(
+                prescription_id, medications, prescription_update.medications
+            )
             
-            # Create new medications
-            for med in prescription_update.medications:
-                med_data = med.dict()
-                med_data["prescription_id"] = prescription_id
-                supabase.table("medications").insert(med_data).execute()
-                
-        # Get updated medications
-        medications_response = supabase.table("medications").select("*").eq("prescription_id", prescription_id).execute()
-        
-        # Return combined result
-        result = updated_prescription.dict()
-        result["medications"] = medications_response.data
+        # The prescription and its medications are written in one transaction
+        row = await apply_prescription_update(prescription_id, prescription_data, upserts, delete_ids)
+        if row is None:
+            # Deleted since it was loaded
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Prescription not found"
+            )
+            
+        # Keep the medications in the requested order
+        written = {med["id"]: med for med in row.get("medications") or []}
+        result = _prescription_result(row)
+        result["medications"] = [written[med["id"]] for med in medications if med["id"] in written]
         
         return result
     except HTTPException:
@@ -245,10 +365,10 @@ async def delete_prescription(
                 detail="Prescription not found"
             )
             
-        supabase = get_supabase_client()
+        db = get_async_postgrest_client()
         
         # Delete medications first
-        supabase.table("medications").delete().eq("prescription_id", prescription_id).execute()
+        await db.from_("medications").delete().eq("prescription_id", prescription_id).execute()
         
         # Delete prescription
         success = await prescription_crud.delete(id=prescription_id)
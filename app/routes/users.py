@@ -1,14 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status, UploadFile, File
 from typing import List, Optional
+from app.core.cache import USER_ENTITY_CACHE, entity_caches, user_cache
 from app.core.dependencies import get_current_active_user, get_current_admin_user
-from app.core.security import get_password_hash
+from app.core.security import hash_password
 from app.db.orm import CRUDBase
+from app.db.pagination import MAX_PAGE_SIZE, set_pagination_headers
 from app.models.user import User, UserUpdate, UserResponse
 from app.utils.file_upload import upload_avatar
 import uuid
 
 router = APIRouter()
-user_crud = CRUDBase(User)
+user_crud = CRUDBase(User, cache=USER_ENTITY_CACHE)
 
 @router.get("/users/me", response_model=UserResponse)
 async def read_users_me(current_user: User = Depends(get_current_active_user)):
@@ -30,13 +32,14 @@ async def update_user_me(
         
         # Hash the password if it's being updated
         if "password" in update_data and update_data["password"]:
-            update_data["hashed_password"] = get_password_hash(update_data.pop("password"))
+            update_data["hashed_password"] = await hash_password(update_data.pop("password"))
         
         # Don't allow users to change their admin status
         if "is_admin" in update_data:
             del update_data["is_admin"]
             
         updated_user = await user_crud.update(id=current_user.id, obj_in=update_data)
+        user_cache.invalidate(current_user.id)
         if not updated_user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -70,6 +73,7 @@ async def upload_user_avatar(
         # Update user with new avatar URL
         update_data = {"avatar_url": avatar_url}
         updated_user = await user_crud.update(id=current_user.id, obj_in=update_data)
+        user_cache.invalidate(current_user.id)
         
         if not updated_user:
             raise HTTPException(
@@ -87,18 +91,39 @@ async def upload_user_avatar(
         )
 
 # Admin routes
+@router.get("/users/cache/stats")
+async def read_user_cache_stats(current_user: User = Depends(get_current_admin_user)):
+    """
+    Get authenticated user cache statistics (admin only)
+    """
+    return user_cache.stats()
+
+@router.get("/cache/entities/stats")
+async def read_entity_cache_stats(current_user: User = Depends(get_current_admin_user)):
+    """
+    Get per-model entity cache statistics (admin only)
+    """
+    return {table_name: cache.stats() for table_name, cache in entity_caches.items()}
+
 @router.get("/users", response_model=List[UserResponse])
 async def read_users(
-    skip: int = 0,
-    limit: int = 100,
+    request: Request,
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    include_total: bool = False,
     current_user: User = Depends(get_current_admin_user)
 ):
     """
     Retrieve users (admin only)
     """
     try:
-        users = await user_crud.get_multi(skip=skip, limit=limit)
-        return users
+        page = await user_crud.get_page(cursor=cursor, limit=limit, skip=skip, include_total=include_total)
+        set_pagination_headers(response, request, page)
+        return page.items
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -143,9 +168,10 @@ async def update_user(
         
         # Hash the password if it's being updated
         if "password" in update_data and update_data["password"]:
-            update_data["hashed_password"] = get_password_hash(update_data.pop("password"))
+            update_data["hashed_password"] = await hash_password(update_data.pop("password"))
             
         updated_user = await user_crud.update(id=user_id, obj_in=update_data)
+        user_cache.invalidate(user_id)
         if not updated_user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -177,6 +203,7 @@ async def delete_user(
             )
             
         success = await user_crud.delete(id=user_id)
+        user_cache.invalidate(user_id)
         if not success:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
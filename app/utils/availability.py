@@ -0,0 +1,206 @@
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+from bisect import bisect_left, insort
+from dataclasses import dataclass, field
+from datetime import datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
+from app.core.indexes import BackgroundIndex
+
+# Columns needed to index an appointment (plus the keyset sort key)
+AVAILABILITY_COLUMNS = "id,doctor_id,appointment_date,duration_minutes,status"
+
+# Appointments in these states don't occupy the doctor
+FREE_STATUSES = ("cancelled",)
+
+Span = Tuple[datetime, datetime]
+
+def to_utc_naive(value: Any) -> datetime:
+    """Parse a datetime (or ISO string) and express it as naive UTC"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def parse_time(value: str) -> time:
+    """Parse an "HH:MM" working-hours bound"""
+    hours, minutes = value.split(":")
+    return time(int(hours), int(minutes))
+
+@dataclass
+class WorkingHours:
+    """Weekly working-hours template in the clinic's timezone"""
+    start: time
+    end: time
+    days: Sequence[int] = (0, 1, 2, 3, 4)  # Monday is 0
+    tz: str = "UTC"
+
+    def windows(self, range_start: datetime, range_end: datetime) -> Iterator[Span]:
+        """Working windows (naive UTC) overlapping [range_start, range_end)"""
+        zone = ZoneInfo(self.tz)
+        day = range_start.replace(tzinfo=timezone.utc).astimezone(zone).date() - timedelta(days=1)
+        last_day = range_end.replace(tzinfo=timezone.utc).astimezone(zone).date()
+        while day <= last_day:
+            if day.weekday() in self.days:
+                start = to_utc_naive(datetime.combine(day, self.start, tzinfo=zone))
+                end = to_utc_naive(datetime.combine(day, self.end, tzinfo=zone))
+                if start < range_end and end > range_start:
+                    yield start, end
+            day += timedelta(days=1)
+
+@dataclass
+class DoctorSchedule:
+    """Booked spans of one doctor, sorted by start"""
+    starts: List[Tuple[datetime, str]] = field(default_factory=list)
+    spans: Dict[str, Span] = field(default_factory=dict)
+    # Longest booked span; bounds how far back an overlapping span can start
+    max_length: timedelta = timedelta(0)
+
+    def add(self, appointment_id: str, start: datetime, end: datetime) -> None:
+        insort(self.starts, (start, appointment_id))
+        self.spans[appointment_id] = (start, end)
+        self.max_length = max(self.max_length, end - start)
+
+    def remove(self, appointment_id: str) -> None:
+        span = self.spans.pop(appointment_id, None)
+        if span is None:
+            return
+        i = bisect_left(self.starts, (span[0], appointment_id))
+        if i < len(self.starts) and self.starts[i] == (span[0], appointment_id):
+            del self.starts[i]
+
+    def overlapping(self, start: datetime, end: datetime) -> Iterator[Tuple[str, Span]]:
+        """Booked spans overlapping [start, end), in start order"""
+        i = bisect_left(self.starts, (start - self.max_length,))
+        while i < len(self.starts):
+            span_start, appointment_id = self.starts[i]
+            if span_start >= end:
+                break
+            span = self.spans[appointment_id]
+            if span[1] > start:
+                yield appointment_id, span
+            i += 1
+
+class AvailabilityIndex(BackgroundIndex):
+    """
+    Per-doctor index of booked appointment spans.
+    Conflict checks are a binary search into the doctor's sorted spans, and
+    free slots are computed by walking the spans inside the working-hours
+    windows of the requested range. Loaded with upcoming appointments at
+    startup and kept current by the appointment write handlers.
+    """
+    name = "availability-index"
+
+    def __init__(
+        self,
+        crud,
+        *,
+        working_hours: WorkingHours,
+        default_duration: timedelta,
+        slot_step: timedelta,
+        refresh_interval: float = 0,
+        page_size: int = 1000,
+    ):
+        super().__init__(refresh_interval=refresh_interval)
+        self.crud = crud
+        self.working_hours = working_hours
+        self.default_duration = default_duration
+        self.slot_step = slot_step
+        self.page_size = page_size
+        self._schedules: Dict[str, DoctorSchedule] = {}
+        self._doctors: Dict[str, str] = {}
+
+    def span_of(self, appointment: Mapping[str, Any]) -> Span:
+        """The naive UTC [start, end) an appointment occupies"""
+        start = to_utc_naive(appointment["appointment_date"])
+        minutes = appointment.get("duration_minutes")
+        return start, start + (timedelta(minutes=minutes) if minutes else self.default_duration)
+
+    def add(self, appointment: Mapping[str, Any]) -> None:
+        """Index a new or updated appointment (cancelled ones are removed)"""
+        appointment_id = str(appointment["id"])
+        self._remove(appointment_id)
+        if appointment.get("status") not in FREE_STATUSES:
+            doctor_id = str(appointment["doctor_id"])
+            start, end = self.span_of(appointment)
+            self._schedules.setdefault(doctor_id, DoctorSchedule()).add(appointment_id, start, end)
+            self._doctors[appointment_id] = doctor_id
+        self._record("add", dict(appointment))
+
+    def remove(self, appointment_id: str) -> None:
+        """Drop a deleted appointment"""
+        self._remove(str(appointment_id))
+        self._record("remove", str(appointment_id))
+
+    def _remove(self, appointment_id: str) -> None:
+        doctor_id = self._doctors.pop(appointment_id, None)
+        if doctor_id is not None:
+            self._schedules[doctor_id].remove(appointment_id)
+
+    def conflicts(self, doctor_id: str, start: datetime, end: datetime, exclude_id: Optional[str] = None) -> List[str]:
+        """Ids of the doctor's appointments overlapping [start, end)"""
+        schedule = self._schedules.get(str(doctor_id))
+        if schedule is None:
+            return []
+        return [
+            appointment_id for appointment_id, _ in schedule.overlapping(to_utc_naive(start), to_utc_naive(end))
+            if appointment_id != exclude_id
+        ]
+
+    def free_slots(
+        self,
+        doctor_id: str,
+        range_start: datetime,
+        range_end: datetime,
+        duration: Optional[timedelta] = None,
+        limit: int = 100,
+    ) -> List[Span]:
+        """
+        Bookable [start, end) slots of `duration` within working hours, starting
+        on the slot grid of each working window
+        """
+        range_start, range_end = to_utc_naive(range_start), to_utc_naive(range_end)
+        duration = duration or self.default_duration
+        step = self.slot_step
+        schedule = self._schedules.get(str(doctor_id)) or DoctorSchedule()
+        slots: List[Span] = []
+
+        for window_start, window_end in self.working_hours.windows(range_start, range_end):
+            lower = max(window_start, range_start)
+            upper = min(window_end, range_end)
+
+            def align(moment: datetime) -> datetime:
+                # First grid point of this window at or after `moment`
+                steps = -((window_start - moment) // step)
+                return window_start + max(steps, 0) * step
+
+            candidate = align(lower)
+            for _, (busy_start, busy_end) in schedule.overlapping(lower, upper):
+                while candidate + duration <= min(busy_start, upper):
+                    slots.append((candidate, candidate + duration))
+                    if len(slots) >= limit:
+                        return slots
+                    candidate += step
+                if busy_end > candidate:
+                    candidate = align(busy_end)
+            while candidate + duration <= upper:
+                slots.append((candidate, candidate + duration))
+                if len(slots) >= limit:
+                    return slots
+                candidate += step
+        return slots
+
+    async def _load(self) -> Tuple[Dict[str, DoctorSchedule], Dict[str, str]]:
+        # Past appointments can't conflict with new bookings
+        since = datetime.utcnow() - timedelta(days=1)
+        filters = [("status", "neq", "cancelled"), ("appointment_date", "gte", since)]
+        schedules: Dict[str, DoctorSchedule] = {}
+        doctors: Dict[str, str] = {}
+        async for row in self.crud.iterate(filters=filters, batch_size=self.page_size, columns=AVAILABILITY_COLUMNS):
+            appointment_id, doctor_id = str(row["id"]), str(row["doctor_id"])
+            start, end = self.span_of(row)
+            schedules.setdefault(doctor_id, DoctorSchedule()).add(appointment_id, start, end)
+            doctors[appointment_id] = doctor_id
+        return schedules, doctors
+
+    def _install(self, state: Tuple[Dict[str, DoctorSchedule], Dict[str, str]]) -> None:
+        self._schedules, self._doctors = state
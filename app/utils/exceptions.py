@@ -52,10 +52,27 @@ class ValidationException(HealthcareException):
             detail=detail
         )
 
+class ConflictException(HealthcareException):
+    """Exception for requests conflicting with existing data"""
+    def __init__(self, detail: str):
+        super().__init__(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=detail
+        )
+
 class FileUploadException(HealthcareException):
     """Exception for file upload errors"""
     def __init__(self, detail: str):
         super().__init__(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"File upload error: {detail}"
+        )
+
+class ServiceUnavailableException(HealthcareException):
+    """Exception for temporarily overloaded services"""
+    def __init__(self, detail: str = "Service temporarily unavailable"):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=detail,
+            headers={"Retry-After": "1"}
         )
\ No newline at end of file
@@ -1,4 +1,5 @@
 from fastapi import UploadFile, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from app.core.config import settings
 from app.db.supabase import get_supabase_storage
 import io
@@ -16,13 +17,14 @@ async def upload_avatar(file: UploadFile, filename: str) -> str:
         
         # Create bucket if it doesn't exist
         try:
-            storage.create_bucket(settings.SUPABASE_BUCKET_AVATARS)
+            await run_in_threadpool(storage.create_bucket, settings.SUPABASE_BUCKET_AVATARS)
         except Exception:
             # Bucket might already exist, continue
             pass
         
-        # Upload file
-        storage.from_(settings.SUPABASE_BUCKET_AVATARS).upload(
+        # Upload file (the storage client is synchronous, keep it off the event loop)
+        await run_in_threadpool(
+            storage.from_(settings.SUPABASE_BUCKET_AVATARS).upload,
             path=filename,
             file=contents,
             file_options={"content-type": file.content_type}
@@ -54,13 +56,14 @@ async def upload_prescription(file: UploadFile, filename: str) -> str:
         
         # Create bucket if it doesn't exist
         try:
-            storage.create_bucket(settings.SUPABASE_BUCKET_PRESCRIPTIONS)
+            await run_in_threadpool(storage.create_bucket, settings.SUPABASE_BUCKET_PRESCRIPTIONS)
         except Exception:
             # Bucket might already exist, continue
             pass
         
-        # Upload file
-        storage.from_(settings.SUPABASE_BUCKET_PRESCRIPTIONS).upload(
+        # Upload file (the storage client is synchronous, keep it off the event loop)
+        await run_in_threadpool(
+            storage.from_(settings.SUPABASE_BUCKET_PRESCRIPTIONS).upload,
             path=filename,
             file=contents,
             file_options={"content-type": file.content_type}
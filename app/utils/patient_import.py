@@ -0,0 +1,187 @@
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from postgrest.types import ReturnMethod
+from app.db.orm import validate_many
+from app.models.patient import PatientCreate
+from app.utils.exceptions import ValidationException
+import asyncio
+import csv
+import io
+import json
+import uuid
+
+IMPORT_FORMATS = ("csv", "ndjson")
+
+# SQLSTATE classes of errors caused by the inserted data itself (data exceptions,
+# integrity constraint violations); only these are worth splitting a batch for
+DATA_ERROR_CLASSES = ("22", "23")
+
+# (row number, parsed record or None, parse error or None)
+Record = Tuple[int, Optional[Dict[str, Any]], Optional[str]]
+# (row number, row ready to insert)
+ImportRow = Tuple[int, Dict[str, Any]]
+
+def detect_format(file: UploadFile, requested: Optional[str] = None) -> str:
+    """Pick the upload format from the explicit choice, file extension or content type"""
+    if requested:
+        if requested not in IMPORT_FORMATS:
+            raise ValidationException(f"Unsupported import format '{requested}', expected one of {', '.join(IMPORT_FORMATS)}")
+        return requested
+    filename = (file.filename or "").lower()
+    content_type = (file.content_type or "").lower()
+    if filename.endswith(".csv") or "csv" in content_type:
+        return "csv"
+    if filename.endswith((".ndjson", ".jsonl", ".json")) or "json" in content_type:
+        return "ndjson"
+    raise ValidationException("Cannot tell the import format, upload a .csv or .ndjson file")
+
+def iter_records(text: io.TextIOBase, fmt: str) -> Iterator[Record]:
+    """Lazily parse an upload into records, one line (or CSV row) at a time"""
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        for number, row in enumerate(reader, start=1):
+            # Blank cells are missing values; unnamed extra cells are ignored
+            yield number, {
+                key.strip(): (value.strip() or None) if isinstance(value, str) else value
+                for key, value in row.items() if key
+            }, None
+        return
+
+    number = 0
+    for line in text:
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            value = json.loads(line)
+        except ValueError as e:
+            yield number, None, f"Invalid JSON: {str(e)}"
+            continue
+        if not isinstance(value, dict):
+            yield number, None, "Expected a JSON object"
+            continue
+        yield number, value, None
+
+def validate_batch(records: Iterator[Record], created_by: str, size: int) -> Tuple[List[ImportRow], List[Dict[str, Any]]]:
+    """Validate the next `size` records against PatientCreate"""
+    numbers: List[int] = []
+    data: List[Dict[str, Any]] = []
+    errors: List[Dict[str, Any]] = []
+    for _ in range(size):
+        try:
+            number, record, error = next(records)
+        except StopIteration:
+            break
+        if error is None:
+            numbers.append(number)
+            data.append(record)
+        else:
+            errors.append({"row": number, "error": error})
+
+    valid, invalid = validate_many(PatientCreate, data)
+    if invalid:
+        errors.extend({"row": numbers[i], "error": message} for i, message in invalid)
+        errors.sort(key=lambda error: error["row"])
+    encoded = jsonable_encoder([patient.dict() for _, patient in valid])
+    rows: List[ImportRow] = []
+    for (i, _), row in zip(valid, encoded):
+        # Ids are generated here so inserts don't need to return rows
+        row["id"] = str(uuid.uuid4())
+        row["created_by"] = created_by
+        rows.append((numbers[i], row))
+    return rows, errors
+
+def _failed(rows: List[ImportRow], error: str) -> List[Dict[str, Any]]:
+    return [{"row": number, "error": error} for number, _ in rows]
+
+async def insert_rows(crud, rows: List[ImportRow]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], Optional[str]]:
+    """
+    Insert rows with one multi-row statement.
+    A batch rejected for its data is split in halves until the offending rows
+    are isolated. Any other error (timeout, connection, permission...) fails
+    the remaining rows at once and is returned as fatal, as smaller batches
+    would only run into it again.
+    Returns (inserted rows, per-row errors, fatal error or None).
+    """
+    result = await crud.create_many([row for _, row in rows], chunk_size=len(rows), returning=ReturnMethod.minimal)
+    if not result.errors:
+        return [row for _, row in rows], [], None
+    error = result.errors[0]
+    if not (error.code or "").startswith(DATA_ERROR_CLASSES):
+        return [], _failed(rows, error.error), error.error
+    if len(rows) == 1:
+        return [], _failed(rows, error.error), None
+    middle = len(rows) // 2
+    inserted, errors, fatal = await insert_rows(crud, rows[:middle])
+    if fatal is not None:
+        return inserted, errors + _failed(rows[middle:], fatal), fatal
+    more_inserted, more_errors, fatal = await insert_rows(crud, rows[middle:])
+    return inserted + more_inserted, errors + more_errors, fatal
+
+def _event(event: str, **data: Any) -> str:
+    return json.dumps({"event": event, **data}) + "\n"
+
+async def import_patients(
+    file: UploadFile,
+    fmt: str,
+    *,
+    crud,
+    created_by: str,
+    batch_size: int = 1000,
+    on_inserted: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+) -> AsyncIterator[str]:
+    """
+    Import patients from an uploaded CSV or NDJSON file, yielding NDJSON events:
+    one "error" per rejected row, one "progress" per inserted batch and a
+    final "summary". Only one batch is held in memory while the next one is
+    parsed and validated. An insert failure not caused by the rows' data stops
+    the import; the summary then carries it as "aborted".
+    """
+    text = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    records = iter_records(text, fmt)
+    totals = {"processed": 0, "inserted": 0, "failed": 0}
+    pending: Optional[asyncio.Task] = None
+    try:
+        while True:
+            # Parse and validate the next batch while the previous one is inserted
+            try:
+                rows, errors = await run_in_threadpool(validate_batch, records, created_by, batch_size)
+            except (UnicodeDecodeError, csv.Error) as e:
+                # The rest of the file can't be read; report it and stop after this batch
+                rows, errors = [], [{"row": None, "error": f"Unreadable file: {str(e)}"}]
+                records = iter(())
+
+            if pending is not None:
+                inserted, insert_errors, fatal = await pending
+                pending = None
+                totals["inserted"] += len(inserted)
+                totals["failed"] += len(insert_errors)
+                for error in insert_errors:
+                    yield _event("error", **error)
+                if on_inserted and inserted:
+                    # One call per batch, so the callback can merge the rows at once
+                    on_inserted(inserted)
+                yield _event("progress", **totals)
+                if fatal is not None:
+                    yield _event("summary", **totals, aborted=fatal)
+                    return
+
+            if not rows and not errors:
+                break
+            totals["processed"] += len(rows) + len(errors)
+            totals["failed"] += len(errors)
+            for error in errors:
+                yield _event("error", **error)
+            if rows:
+                pending = asyncio.create_task(insert_rows(crud, rows))
+            else:
+                yield _event("progress", **totals)
+
+        yield _event("summary", **totals)
+    finally:
+        if pending is not None:
+            pending.cancel()
+        # Leave the upload's underlying file for FastAPI to close
+        text.detach()
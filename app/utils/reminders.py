@@ -0,0 +1,288 @@
+from abc import ABC, abstractmethod
+from typing import Any, Deque, Dict, List, Mapping, Optional, Sequence, Tuple
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from app.db.supabase import get_async_postgrest_client
+from app.utils.availability import to_utc_naive
+import asyncio
+import heapq
+import logging
+import os
+import socket
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Columns a reminder needs (plus the keyset sort key)
+REMINDER_COLUMNS = "id,patient_id,doctor_id,appointment_date,reason,status"
+
+EPOCH = datetime(1970, 1, 1)
+
+# Wait before retrying due reminders whose database check failed
+RETRY_DELAY = timedelta(seconds=5)
+
+# (fire at, appointment id, offset in seconds)
+ReminderEntry = Tuple[datetime, str, int]
+
+@dataclass
+class RangeLease:
+    """What this worker knows about the lease of one time range"""
+    owned: bool
+    expires_at: datetime
+    # Reminders firing before this were due before the range was claimed
+    since: datetime
+
+class ReminderSender(ABC):
+    """Delivers appointment reminders (SMS, e-mail, push...)"""
+    @abstractmethod
+    async def send(self, appointment: Mapping[str, Any], offset: timedelta) -> None:
+        """Deliver one reminder `offset` ahead of the appointment"""
+
+class LoggingReminderSender(ReminderSender):
+    """Local stand-in that logs reminders and remembers the most recent ones"""
+    def __init__(self, history: int = 1000):
+        self.sent: Deque[Tuple[str, timedelta]] = deque(maxlen=history)
+
+    async def send(self, appointment: Mapping[str, Any], offset: timedelta) -> None:
+        self.sent.append((str(appointment["id"]), offset))
+        logger.info(
+            "Reminder for appointment %s at %s (%s before)",
+            appointment["id"], appointment["appointment_date"], offset,
+        )
+
+class ReminderScheduler:
+    """
+    In-process scheduler firing appointment reminders `offsets` before each
+    scheduled appointment.
+    Time is split into ranges of `lease_length`; a worker leases a range through
+    the `claim_reminder_lease` RPC before it loads that range's reminders into
+    its heap, so every range is owned by exactly one worker. Appointment writes
+    in the owning worker update the heap in O(log n); stale heap entries are
+    skipped when popped, and every reminder is checked against the database
+    right before it is sent.
+    Every `refresh_interval` the owner renews its leases and re-reads its
+    ranges, picking up appointments booked through other workers, while the
+    others retry ranges whose lease has expired (its owner stopped renewing).
+    """
+    def __init__(
+        self,
+        crud,
+        sender: ReminderSender,
+        *,
+        offsets: Sequence[timedelta],
+        lease_length: timedelta = timedelta(minutes=5),
+        refresh_interval: Optional[timedelta] = None,
+        lookahead: int = 2,
+        page_size: int = 1000,
+    ):
+        self.crud = crud
+        self.sender = sender
+        self.offsets = tuple(offsets)
+        self.lease_length = lease_length
+        self.refresh_interval = refresh_interval or lease_length / 5
+        # Outlives a few missed renewals, but lets another worker take over
+        # soon after the owner stops
+        self.lease_ttl = timedelta(seconds=max(int(3 * self.refresh_interval.total_seconds()), 1))
+        self.lookahead = lookahead
+        self.page_size = page_size
+        self.owner = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._heap: List[ReminderEntry] = []
+        # Current fire time per (appointment id, offset); heap entries that
+        # don't match are stale
+        self._pending: Dict[Tuple[str, int], datetime] = {}
+        # Reminders already fired (or dropped after their check), so that
+        # re-reading a range doesn't queue them again
+        self._fired: Dict[Tuple[str, int], datetime] = {}
+        # Leases of the time ranges seen so far
+        self._ranges: Dict[datetime, RangeLease] = {}
+        self._next_refresh = EPOCH
+        self._wakeup = asyncio.Event()
+        # Due reminders aren't retried before this time after a failed check
+        self._retry_at = EPOCH
+        self._task: Optional[asyncio.Task] = None
+
+    def range_start(self, moment: datetime) -> datetime:
+        """Start of the lease range containing `moment`"""
+        return moment - (moment - EPOCH) % self.lease_length
+
+    def schedule(self, appointment: Mapping[str, Any]) -> None:
+        """(Re)schedule the reminders of a new or updated appointment"""
+        appointment_id = str(appointment["id"])
+        if appointment.get("status") != "scheduled":
+            self.unschedule(appointment_id)
+            return
+        start = to_utc_naive(appointment["appointment_date"])
+        now = datetime.utcnow()
+        for offset in self.offsets:
+            key = (appointment_id, int(offset.total_seconds()))
+            fire_at = start - offset
+            lease = self._ranges.get(self.range_start(fire_at))
+            if fire_at < now or lease is None or not lease.owned:
+                # Past, or left to the worker owning that range
+                self._pending.pop(key, None)
+                continue
+            self._push(key, fire_at)
+
+    def unschedule(self, appointment_id: str) -> None:
+        """Drop the reminders of a cancelled or deleted appointment"""
+        for offset in self.offsets:
+            self._pending.pop((str(appointment_id), int(offset.total_seconds())), None)
+
+    def _push(self, key: Tuple[str, int], fire_at: datetime) -> None:
+        if self._pending.get(key) == fire_at or self._fired.get(key) == fire_at:
+            return
+        self._pending[key] = fire_at
+        heapq.heappush(self._heap, (fire_at, key[0], key[1]))
+        if self._heap[0][0] == fire_at:
+            self._wakeup.set()
+
+    async def _claim(self, range_start: datetime) -> Optional[Tuple[bool, datetime]]:
+        """Take or renew a range's lease; (owned, lease expiry), or None if unknown"""
+        db = get_async_postgrest_client()
+        response = await db.rpc("claim_reminder_lease", {
+            "lease_range_start": range_start.isoformat() + "+00:00",
+            "lease_owner": self.owner,
+            "lease_seconds": int(self.lease_ttl.total_seconds()),
+        }).execute()
+        if not response.data:
+            # Lost a race with another worker's first claim; retried next refresh
+            return None
+        lease = response.data[0]
+        return lease["owner"] == self.owner, to_utc_naive(lease["expires_at"])
+
+    async def _load_range(self, range_start: datetime, since: datetime) -> None:
+        """Queue every reminder firing within an owned range from `since` on"""
+        range_end = range_start + self.lease_length
+        for offset in self.offsets:
+            seconds = int(offset.total_seconds())
+            filters = [
+                ("status", "eq", "scheduled"),
+                ("appointment_date", "gte", max(range_start, since) + offset),
+                ("appointment_date", "lt", range_end + offset),
+            ]
+            async for row in self.crud.iterate(filters=filters, batch_size=self.page_size, columns=REMINDER_COLUMNS):
+                self._push((str(row["id"]), seconds), to_utc_naive(row["appointment_date"]) - offset)
+
+    async def _claim_ranges(self, now: datetime) -> None:
+        """Renew and re-read owned ranges, and claim new or expired ones"""
+        current = self.range_start(now)
+        for i in range(self.lookahead):
+            range_start = current + i * self.lease_length
+            lease = self._ranges.get(range_start)
+            if lease is not None and not lease.owned and lease.expires_at > now:
+                # Held by another worker that is still renewing it
+                continue
+            try:
+                claimed = await self._claim(range_start)
+                if claimed is None:
+                    continue
+                owned, expires_at = claimed
+                if lease is None:
+                    # Reminders of a range first seen now that were already due are past
+                    since = now
+                elif lease.owned:
+                    since = lease.since
+                else:
+                    # Taken over: resume from the previous owner's last renewal
+                    since = lease.expires_at - self.lease_ttl
+                if owned:
+                    await self._load_range(range_start, since)
+                elif lease is not None and lease.owned:
+                    # Our lease lapsed and another worker took the range over
+                    self._drop_range(range_start)
+            except Exception:
+                # Retried on the next refresh
+                logger.exception("Failed to claim reminder range %s", range_start)
+                continue
+            self._ranges[range_start] = RangeLease(owned, expires_at, since)
+        for range_start in [r for r in self._ranges if r < current]:
+            del self._ranges[range_start]
+        for key in [k for k, fire_at in self._fired.items() if fire_at < current]:
+            del self._fired[key]
+
+    def _drop_range(self, range_start: datetime) -> None:
+        range_end = range_start + self.lease_length
+        for key in [k for k, fire_at in self._pending.items() if range_start <= fire_at < range_end]:
+            del self._pending[key]
+
+    async def _fire_due(self, now: datetime) -> None:
+        due: List[Tuple[Tuple[str, int], datetime]] = []
+        while self._heap and self._heap[0][0] <= now:
+            fire_at, appointment_id, seconds = heapq.heappop(self._heap)
+            key = (appointment_id, seconds)
+            if self._pending.get(key) == fire_at:
+                del self._pending[key]
+                self._fired[key] = fire_at
+                due.append((key, fire_at))
+        if not due:
+            return
+
+        # Re-read the appointments: they may have moved or been cancelled elsewhere
+        ids = list({appointment_id for (appointment_id, _), _ in due})
+        try:
+            page = await self.crud.fetch_page(filters=[("id", "in", ids)], limit=len(ids), columns=REMINDER_COLUMNS)
+        except Exception:
+            # Put them back (unless rescheduled meanwhile) and retry later
+            for key, fire_at in due:
+                if self._fired.get(key) == fire_at:
+                    del self._fired[key]
+                if key not in self._pending:
+                    self._push(key, fire_at)
+            self._retry_at = datetime.utcnow() + RETRY_DELAY
+            raise
+        current = {str(row["id"]): row for row in page.items}
+
+        sends = []
+        for (appointment_id, seconds), fire_at in due:
+            appointment = current.get(appointment_id)
+            offset = timedelta(seconds=seconds)
+            if (
+                appointment is None
+                or appointment.get("status") != "scheduled"
+                or to_utc_naive(appointment["appointment_date"]) - offset != fire_at
+            ):
+                continue
+            sends.append(self.sender.send(appointment, offset))
+        for result in await asyncio.gather(*sends, return_exceptions=True):
+            if isinstance(result, Exception):
+                logger.error("Failed to send reminder: %s", result)
+
+    async def _run(self) -> None:
+        while True:
+            now = datetime.utcnow()
+            try:
+                if now >= self._next_refresh:
+                    self._next_refresh = now + self.refresh_interval
+                    await self._claim_ranges(now)
+                await self._fire_due(now)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Reminder scheduler tick failed")
+
+            # Sleep until the next reminder or the next lease refresh
+            now = datetime.utcnow()
+            wake_at = self._next_refresh
+            if self._heap:
+                wake_at = min(wake_at, max(self._heap[0][0], self._retry_at))
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=max((wake_at - now).total_seconds(), 0.05))
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self) -> None:
+        """Start claiming ranges and firing reminders"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="reminder-scheduler")
+
+    async def stop(self) -> None:
+        """Stop the scheduler"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,22 @@
+/*
+  # Keyset pagination indexes
+
+  1. New Indexes
+    - `users` (created_at, id)
+    - `patients` (created_at, id)
+    - `prescriptions` (created_at, id)
+    - `appointments` (appointment_date, id)
+
+  2. Removed Indexes
+    - `idx_appointments_date`, superseded by `idx_appointments_date_id`
+
+  List endpoints page with `WHERE (sort_key, id) > (cursor) ORDER BY sort_key, id
+  LIMIT n`, which these indexes serve without scanning skipped rows.
+*/
+
+CREATE INDEX IF NOT EXISTS idx_users_created_at_id ON users(created_at, id);
+CREATE INDEX IF NOT EXISTS idx_patients_created_at_id ON patients(created_at, id);
+CREATE INDEX IF NOT EXISTS idx_prescriptions_created_at_id ON prescriptions(created_at, id);
+CREATE INDEX IF NOT EXISTS idx_appointments_date_id ON appointments(appointment_date, id);
+
+DROP INDEX IF EXISTS idx_appointments_date;
@@ -0,0 +1,76 @@
+/*
+  # Transactional prescription creation
+
+  1. New Functions
+    - `create_prescriptions(payload jsonb)`
+      - `payload` is a JSON array of prescriptions, each with a `medications` array
+      - inserts every prescription and medication in a single statement, so a
+        call either creates everything or nothing
+      - returns the created prescriptions, in payload order, each with its
+        inserted `medications` rows (ids and defaults included) embedded
+
+  2. Security
+    - SECURITY INVOKER, so the existing RLS insert policies still apply
+*/
+
+CREATE OR REPLACE FUNCTION create_prescriptions(payload jsonb)
+RETURNS jsonb
+LANGUAGE sql
+SECURITY INVOKER
+AS $$
+  WITH items AS (
+    SELECT gen_random_uuid() AS id, item, ord
+    FROM jsonb_array_elements(payload) WITH ORDINALITY AS t(item, ord)
+  ),
+  meds AS (
+    SELECT
+      gen_random_uuid() AS id,
+      items.id AS prescription_id,
+      med->>'name' AS name,
+      med->>'dosage' AS dosage,
+      med->>'frequency' AS frequency,
+      med->>'duration' AS duration,
+      med->>'instructions' AS instructions,
+      med_ord
+    FROM items,
+      jsonb_array_elements(coalesce(items.item->'medications', '[]'::jsonb)) WITH ORDINALITY AS m(med, med_ord)
+  ),
+  new_prescriptions AS (
+    INSERT INTO prescriptions (id, patient_id, doctor_id, diagnosis, notes, file_url)
+    SELECT
+      id,
+      (item->>'patient_id')::uuid,
+      (item->>'doctor_id')::uuid,
+      item->>'diagnosis',
+      item->>'notes',
+      item->>'file_url'
+    FROM items
+    RETURNING *
+  ),
+  new_medications AS (
+    INSERT INTO medications (id, prescription_id, name, dosage, frequency, duration, instructions)
+    SELECT id, prescription_id, name, dosage, frequency, duration, instructions
+    FROM meds
+    RETURNING *
+  )
+  SELECT coalesce(
+    jsonb_agg(
+      to_jsonb(p) || jsonb_build_object(
+        'medications',
+        coalesce(
+          (
+            SELECT jsonb_agg(to_jsonb(m) ORDER BY meds.med_ord)
+            FROM new_medications m
+            JOIN meds ON meds.id = m.id
+            WHERE m.prescription_id = p.id
+          ),
+          '[]'::jsonb
+        )
+      )
+      ORDER BY items.ord
+    ),
+    '[]'::jsonb
+  )
+  FROM new_prescriptions p
+  JOIN items ON items.id = p.id;
+$$;
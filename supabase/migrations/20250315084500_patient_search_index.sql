@@ -0,0 +1,76 @@
+/*
+  # Indexed patient search
+
+  1. Extensions
+    - `pg_trgm` for trigram similarity and indexed substring matching
+
+  2. New Functions
+    - `patient_search_vector(first_name, last_name, email, phone_number)`
+      - IMMUTABLE; the weighted tsvector of name, email and phone digits
+    - `search_patients(query text, result_limit int, result_offset int)`
+      - matches name/email/phone by word prefix, substring or similarity
+      - returns the best matches first
+
+  3. New Indexes
+    - GIN on `patient_search_vector(first_name, last_name, email, phone_number)`
+    - trigram GIN on the lower-cased full name, email and phone digits
+
+  The tsvector is only indexed, not stored, so `patients` isn't rewritten and
+  `select=*` doesn't return it.
+*/
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE OR REPLACE FUNCTION patient_search_vector(first_name text, last_name text, email text, phone_number text)
+RETURNS tsvector
+LANGUAGE sql
+IMMUTABLE
+AS $$
+  SELECT
+    setweight(to_tsvector('simple', coalesce(first_name, '') || ' ' || coalesce(last_name, '')), 'A') ||
+    setweight(to_tsvector('simple', coalesce(email, '')), 'B') ||
+    setweight(to_tsvector('simple', regexp_replace(coalesce(phone_number, ''), '\D', '', 'g')), 'B')
+$$;
+
+CREATE INDEX IF NOT EXISTS idx_patients_search_vector
+  ON patients USING gin(patient_search_vector(first_name, last_name, email, phone_number));
+CREATE INDEX IF NOT EXISTS idx_patients_full_name_trgm ON patients USING gin((lower(first_name || ' ' || last_name)) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_patients_email_trgm ON patients USING gin((lower(email)) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_patients_phone_trgm ON patients USING gin((regexp_replace(phone_number, '\D', '', 'g')) gin_trgm_ops);
+
+CREATE OR REPLACE FUNCTION search_patients(query text, result_limit integer DEFAULT 20, result_offset integer DEFAULT 0)
+RETURNS SETOF patients
+LANGUAGE sql
+STABLE
+SECURITY INVOKER
+AS $$
+  WITH q AS (
+    SELECT
+      lower(trim(query)) AS text,
+      -- LIKE pattern with the user's wildcards escaped
+      '%' || replace(replace(replace(lower(trim(query)), '\', '\\'), '%', '\%'), '_', '\_') || '%' AS pattern,
+      regexp_replace(query, '\D', '', 'g') AS digits,
+      (
+        SELECT to_tsquery('simple', string_agg(quote_literal(token) || ':*', ' & '))
+        FROM unnest(regexp_split_to_array(lower(trim(query)), '[^[:alnum:]@.]+')) AS token
+        WHERE token <> ''
+      ) AS prefix_query
+  )
+  SELECT p.*
+  FROM patients p, q
+  WHERE q.text <> ''
+    AND (
+      patient_search_vector(p.first_name, p.last_name, p.email, p.phone_number) @@ q.prefix_query
+      OR lower(p.first_name || ' ' || p.last_name) % q.text
+      OR lower(p.first_name || ' ' || p.last_name) LIKE q.pattern
+      OR lower(p.email) LIKE q.pattern
+      OR (length(q.digits) >= 3 AND regexp_replace(p.phone_number, '\D', '', 'g') LIKE '%' || q.digits || '%')
+    )
+  ORDER BY
+    coalesce(ts_rank(patient_search_vector(p.first_name, p.last_name, p.email, p.phone_number), q.prefix_query), 0)
+      + similarity(lower(p.first_name || ' ' || p.last_name), q.text) DESC,
+    p.created_at,
+    p.id
+  LIMIT least(greatest(result_limit, 1), 100)
+  OFFSET greatest(result_offset, 0);
+$$;
@@ -0,0 +1,39 @@
+/*
+  # Composite indexes for the list endpoints
+
+  1. New Indexes
+    - `appointments` (doctor_id, appointment_date, id)
+    - `appointments` (patient_id, appointment_date, id)
+    - `appointments` (doctor_id, appointment_date, id) WHERE status = 'scheduled'
+    - `appointments` (appointment_date, id) WHERE status = 'scheduled'
+    - `prescriptions` (patient_id, created_at, id)
+    - `prescriptions` (doctor_id, created_at, id)
+
+  2. Removed Indexes
+    - `idx_appointments_doctor_id`, `idx_appointments_patient_id`,
+      `idx_prescriptions_patient_id` and `idx_prescriptions_doctor_id`,
+      superseded by the composite indexes that start with the same column
+
+  `GET /appointments` and `GET /prescriptions` filter on a doctor or patient
+  (plus a date range and status for appointments) and page ordered by the
+  keyset sort key, so an index on (filter column, sort key) answers a page
+  with one range scan and no sort. Scheduled appointments are a small,
+  frequently listed subset and get their own partial indexes.
+
+  Checked by supabase/tests/database/list_query_plans.test.sql.
+*/
+
+CREATE INDEX IF NOT EXISTS idx_appointments_doctor_date_id ON appointments(doctor_id, appointment_date, id);
+CREATE INDEX IF NOT EXISTS idx_appointments_patient_date_id ON appointments(patient_id, appointment_date, id);
+CREATE INDEX IF NOT EXISTS idx_appointments_scheduled_doctor_date_id ON appointments(doctor_id, appointment_date, id)
+  WHERE status = 'scheduled';
+CREATE INDEX IF NOT EXISTS idx_appointments_scheduled_date_id ON appointments(appointment_date, id)
+  WHERE status = 'scheduled';
+
+CREATE INDEX IF NOT EXISTS idx_prescriptions_patient_created_at_id ON prescriptions(patient_id, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_prescriptions_doctor_created_at_id ON prescriptions(doctor_id, created_at, id);
+
+DROP INDEX IF EXISTS idx_appointments_doctor_id;
+DROP INDEX IF EXISTS idx_appointments_patient_id;
+DROP INDEX IF EXISTS idx_prescriptions_patient_id;
+DROP INDEX IF EXISTS idx_prescriptions_doctor_id;
@@ -0,0 +1,63 @@
+/*
+  # Prevent overlapping appointments per doctor
+
+  1. Changes
+    - `appointments.duration_minutes` (integer, default 30)
+
+  2. New Functions
+    - `appointment_range(timestamptz, integer)`: immutable helper returning
+      [appointment_date, appointment_date + duration)
+    - `during(appointments)`: PostgREST computed field with the same range, so
+      `during=ov.[start,end)` filters use the constraint's GiST index while
+      `select=*` doesn't return an extra column
+
+  3. Constraints
+    - `appointments_doctor_no_overlap`: EXCLUDE USING gist
+      (doctor_id WITH =, appointment_range(appointment_date, duration_minutes) WITH &&)
+      for appointments that are not cancelled
+
+  The API checks for conflicts before booking, but two workers can still
+  race; the exclusion constraint makes the database the final arbiter and
+  PostgREST reports violations as error 23P01. The range is an index
+  expression rather than a stored column, so rows carry no extra data.
+
+  Existing overlapping appointments make the constraint fail to build; list
+  them before migrating with:
+
+    SELECT a.id, b.id FROM appointments a JOIN appointments b
+      ON a.doctor_id = b.doctor_id AND a.id < b.id
+     AND a.appointment_date < b.appointment_date + interval '30 minutes'
+     AND b.appointment_date < a.appointment_date + interval '30 minutes'
+     WHERE a.status <> 'cancelled' AND b.status <> 'cancelled';
+*/
+
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+
+ALTER TABLE appointments
+  ADD COLUMN IF NOT EXISTS duration_minutes integer NOT NULL DEFAULT 30
+  CHECK (duration_minutes > 0);
+
+-- Adding minutes to a timestamptz doesn't depend on the session time zone,
+-- so the expression is safe to declare IMMUTABLE for an index expression
+CREATE OR REPLACE FUNCTION appointment_range(start_at timestamptz, minutes integer)
+RETURNS tstzrange
+LANGUAGE sql
+IMMUTABLE
+PARALLEL SAFE
+AS $$
+  SELECT tstzrange(start_at, start_at + minutes * interval '1 minute', '[)')
+$$;
+
+CREATE OR REPLACE FUNCTION during(appointments)
+RETURNS tstzrange
+LANGUAGE sql
+IMMUTABLE
+PARALLEL SAFE
+AS $$
+  SELECT appointment_range($1.appointment_date, $1.duration_minutes)
+$$;
+
+ALTER TABLE appointments
+  ADD CONSTRAINT appointments_doctor_no_overlap
+  EXCLUDE USING gist (doctor_id WITH =, appointment_range(appointment_date, duration_minutes) WITH &&)
+  WHERE (status <> 'cancelled');
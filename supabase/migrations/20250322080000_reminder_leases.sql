@@ -0,0 +1,55 @@
+/*
+  # Reminder scheduler leases
+
+  1. New Tables
+    - `reminder_leases`
+      - `range_start` (timestamptz, primary key) start of a reminder time range
+      - `owner` (text) worker that sends the reminders of the range
+      - `expires_at` (timestamptz)
+
+  2. Functions
+    - `claim_reminder_lease(lease_range_start, lease_owner, lease_seconds)` takes
+      or renews the range's lease when it is free, expired, or already the
+      caller's, and returns the lease's current `owner` and `expires_at` so a
+      worker that lost the claim knows when to try again
+
+  3. Security
+    - RLS enabled without policies; the table is only reached through the
+      SECURITY DEFINER function
+*/
+
+CREATE TABLE IF NOT EXISTS reminder_leases (
+  range_start TIMESTAMPTZ PRIMARY KEY,
+  owner TEXT NOT NULL,
+  expires_at TIMESTAMPTZ NOT NULL
+);
+
+ALTER TABLE reminder_leases ENABLE ROW LEVEL SECURITY;
+
+CREATE OR REPLACE FUNCTION claim_reminder_lease(
+  lease_range_start timestamptz,
+  lease_owner text,
+  lease_seconds integer
+)
+RETURNS TABLE (owner text, expires_at timestamptz)
+LANGUAGE sql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+  -- Forget ranges that ended long ago
+  DELETE FROM reminder_leases WHERE reminder_leases.expires_at < now() - interval '1 day';
+
+  WITH claimed AS (
+    INSERT INTO reminder_leases AS lease (range_start, owner, expires_at)
+    VALUES (lease_range_start, lease_owner, now() + make_interval(secs => lease_seconds))
+    ON CONFLICT (range_start) DO UPDATE
+      SET owner = EXCLUDED.owner, expires_at = EXCLUDED.expires_at
+      WHERE lease.expires_at < now() OR lease.owner = EXCLUDED.owner
+    RETURNING lease.owner, lease.expires_at
+  )
+  SELECT claimed.owner, claimed.expires_at FROM claimed
+  UNION ALL
+  -- Lost the claim: report the holder's lease
+  SELECT held.owner, held.expires_at FROM reminder_leases held
+  WHERE held.range_start = lease_range_start AND NOT EXISTS (SELECT 1 FROM claimed);
+$$;
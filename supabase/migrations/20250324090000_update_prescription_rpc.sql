@@ -0,0 +1,75 @@
+/*
+  # Transactional prescription update
+
+  1. New Functions
+    - `update_prescription(target_id uuid, changes jsonb, medication_upserts jsonb, medication_deletes uuid[])`
+      - `changes` holds the prescription fields to set (`diagnosis`, `notes`,
+        `file_url`); absent keys are left alone
+      - `medication_upserts` is a JSON array of medication rows (with ids) to
+        insert or update, `medication_deletes` the ids of medications to remove
+      - the prescription row and all its medication writes are applied in one
+        transaction, so a call either applies everything or nothing
+      - returns the updated prescription with its `medications` array embedded,
+        or NULL when no prescription has `target_id`
+
+  2. Security
+    - SECURITY INVOKER, so the existing RLS update/insert/delete policies still apply
+*/
+
+CREATE OR REPLACE FUNCTION update_prescription(
+  target_id uuid,
+  changes jsonb,
+  medication_upserts jsonb,
+  medication_deletes uuid[]
+)
+RETURNS jsonb
+LANGUAGE plpgsql
+SECURITY INVOKER
+AS $$
+DECLARE
+  updated prescriptions;
+BEGIN
+  -- Always runs, so the row stays locked against concurrent deletes until commit
+  UPDATE prescriptions SET
+    diagnosis = CASE WHEN changes ? 'diagnosis' THEN changes->>'diagnosis' ELSE diagnosis END,
+    notes = CASE WHEN changes ? 'notes' THEN changes->>'notes' ELSE notes END,
+    file_url = CASE WHEN changes ? 'file_url' THEN changes->>'file_url' ELSE file_url END
+  WHERE id = target_id
+  RETURNING * INTO updated;
+
+  IF NOT FOUND THEN
+    RETURN NULL;
+  END IF;
+
+  DELETE FROM medications
+  WHERE prescription_id = target_id
+    AND id = ANY(coalesce(medication_deletes, '{}'));
+
+  INSERT INTO medications (id, prescription_id, name, dosage, frequency, duration, instructions)
+  SELECT
+    (med->>'id')::uuid,
+    target_id,
+    med->>'name',
+    med->>'dosage',
+    med->>'frequency',
+    med->>'duration',
+    med->>'instructions'
+  FROM jsonb_array_elements(coalesce(medication_upserts, '[]'::jsonb)) AS m(med)
+  ON CONFLICT (id) DO UPDATE SET
+    name = excluded.name,
+    dosage = excluded.dosage,
+    frequency = excluded.frequency,
+    duration = excluded.duration,
+    instructions = excluded.instructions
+  -- Never move another prescription's medication
+  WHERE medications.prescription_id = target_id;
+
+  RETURN to_jsonb(updated) || jsonb_build_object(
+    'medications',
+    coalesce(
+      (SELECT jsonb_agg(to_jsonb(med)) FROM medications med WHERE med.prescription_id = target_id),
+      '[]'::jsonb
+    )
+  );
+END;
+$$;
@@ -0,0 +1,106 @@
+-- Plan regression checks for the list endpoints (run with `supabase test db`).
+-- The queries mirror what PostgREST issues for GET /appointments and
+-- GET /prescriptions: equality filters, an optional date range, ordered by
+-- the keyset sort key with LIMIT page_size + 1.
+BEGIN;
+
+SELECT plan(6);
+
+-- Representative data: many doctors and patients, few rows per filter value
+INSERT INTO users (id, email, full_name, hashed_password)
+SELECT md5('doctor-' || i)::uuid, 'doctor' || i || '@example.com', 'Doctor ' || i, 'x'
+FROM generate_series(1, 50) AS i;
+
+INSERT INTO patients (id, first_name, last_name, date_of_birth, gender, phone_number, created_by)
+SELECT md5('patient-' || i)::uuid, 'First' || i, 'Last' || i, '1980-01-01', 'f', '555' || i, md5('doctor-1')::uuid
+FROM generate_series(1, 2000) AS i;
+
+INSERT INTO appointments (patient_id, doctor_id, appointment_date, reason, status)
+SELECT
+  md5('patient-' || (i % 2000 + 1))::uuid,
+  md5('doctor-' || (i % 50 + 1))::uuid,
+  '2025-01-01'::timestamptz + (i || ' minutes')::interval * 37,
+  'Checkup',
+  CASE WHEN i % 5 = 0 THEN 'scheduled' WHEN i % 5 = 1 THEN 'cancelled' ELSE 'completed' END
+FROM generate_series(1, 20000) AS i;
+
+INSERT INTO prescriptions (patient_id, doctor_id, diagnosis, created_at)
+SELECT
+  md5('patient-' || (i % 2000 + 1))::uuid,
+  md5('doctor-' || (i % 50 + 1))::uuid,
+  'Diagnosis',
+  '2025-01-01'::timestamptz + (i || ' minutes')::interval
+FROM generate_series(1, 10000) AS i;
+
+ANALYZE users, patients, appointments, prescriptions;
+
+-- Names of every index used anywhere in the plan of `query`
+CREATE FUNCTION pg_temp.plan_indexes(query text) RETURNS text[]
+LANGUAGE plpgsql AS $$
+DECLARE
+  plan jsonb;
+BEGIN
+  EXECUTE 'EXPLAIN (FORMAT JSON) ' || query INTO plan;
+  RETURN ARRAY(SELECT jsonb_path_query(plan, 'strict $.**."Index Name"') #>> '{}');
+END;
+$$;
+
+SELECT ok(
+  'idx_appointments_doctor_date_id' = ANY(pg_temp.plan_indexes($q$
+    SELECT * FROM appointments
+    WHERE doctor_id = md5('doctor-7')::uuid
+      AND appointment_date >= '2025-01-10' AND appointment_date <= '2025-03-01'
+    ORDER BY appointment_date, id LIMIT 101
+  $q$)),
+  'appointments by doctor and date range use idx_appointments_doctor_date_id'
+);
+
+SELECT ok(
+  'idx_appointments_patient_date_id' = ANY(pg_temp.plan_indexes($q$
+    SELECT * FROM appointments
+    WHERE patient_id = md5('patient-42')::uuid
+    ORDER BY appointment_date, id LIMIT 101
+  $q$)),
+  'appointments by patient use idx_appointments_patient_date_id'
+);
+
+SELECT ok(
+  'idx_appointments_scheduled_doctor_date_id' = ANY(pg_temp.plan_indexes($q$
+    SELECT * FROM appointments
+    WHERE doctor_id = md5('doctor-7')::uuid AND status = 'scheduled'
+      AND appointment_date >= '2025-01-10'
+    ORDER BY appointment_date, id LIMIT 101
+  $q$)),
+  'scheduled appointments by doctor use idx_appointments_scheduled_doctor_date_id'
+);
+
+SELECT ok(
+  'idx_appointments_scheduled_date_id' = ANY(pg_temp.plan_indexes($q$
+    SELECT * FROM appointments
+    WHERE status = 'scheduled' AND appointment_date >= '2025-01-10'
+    ORDER BY appointment_date, id LIMIT 101
+  $q$)),
+  'scheduled appointments by date use idx_appointments_scheduled_date_id'
+);
+
+SELECT ok(
+  'idx_prescriptions_patient_created_at_id' = ANY(pg_temp.plan_indexes($q$
+    SELECT * FROM prescriptions
+    WHERE patient_id = md5('patient-42')::uuid
+    ORDER BY created_at, id LIMIT 101
+  $q$)),
+  'prescriptions by patient use idx_prescriptions_patient_created_at_id'
+);
+
+SELECT ok(
+  'idx_prescriptions_doctor_created_at_id' = ANY(pg_temp.plan_indexes($q$
+    SELECT * FROM prescriptions
+    WHERE doctor_id = md5('doctor-7')::uuid
+    ORDER BY created_at, id LIMIT 101
+  $q$)),
+  'prescriptions by doctor use idx_prescriptions_doctor_created_at_id'
+);
+
+SELECT * FROM finish();
+
+ROLLBACK;